@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -51,6 +52,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'main_app.instrumentation.SQLInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -114,13 +116,90 @@ WSGI_APPLICATION = 'farsh.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
+# DB_ENGINE=postgresql switches to PostgreSQL (needs `pip install "psycopg[binary,pool]"`),
+# configured by DB_NAME / DB_USER / DB_PASSWORD / DB_HOST / DB_PORT.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'farsh'),
+            'USER': os.environ.get('DB_USER', 'farsh'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            # the pool replaces persistent connections, so CONN_MAX_AGE stays 0
+            'CONN_MAX_AGE': 0,
+            'OPTIONS': {
+                'pool': {
+                    'min_size': int(os.environ.get('DB_POOL_MIN', 2)),
+                    'max_size': int(os.environ.get('DB_POOL_MAX', 10)),
+                    'timeout': 10,
+                },
+            },
+        }
+    }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', BASE_DIR / 'db.sqlite3'),
+            # keep the connection across requests, checked before reuse
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # seconds to wait on a locked database instead of failing right away
+                'timeout': 20,
+                # take the write lock at BEGIN, so two writers can't deadlock upgrading read locks
+                'transaction_mode': 'IMMEDIATE',
+                # run on every new connection; WAL lets readers continue during a write
+                'init_command': (
+                    'PRAGMA journal_mode=WAL;'
+                    'PRAGMA synchronous=NORMAL;'
+                    'PRAGMA mmap_size=268435456;'
+                    'PRAGMA cache_size=-65536;'
+                    'PRAGMA busy_timeout=20000;'
+                    'PRAGMA temp_store=MEMORY'
+                ),
+            },
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# shared between gunicorn workers, so the reports cache sees every order write
+
+CACHES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
     }
 }
 
+# seconds a report response stays cached; order writes invalidate it sooner
+REPORTS_CACHE_TIMEOUT = 60 * 60
+
+# background threads per process that encode uploaded product images;
+# 0 leaves them pending for `manage.py process_images`
+IMAGE_WORKERS = 2
+# encodings written for every image variant; add "AVIF" if the CPU budget allows
+IMAGE_VARIANT_FORMATS = ["WEBP", "JPEG"]
+
+# on-demand resizes from /api/products/<id>/image/, evicted least recently used first
+IMAGE_RENDER_CACHE_DIR = BASE_DIR / 'image_cache'
+IMAGE_RENDER_CACHE_BYTES = 512 * 1024 * 1024
+IMAGE_RENDER_MAX_AGE = 60 * 60 * 24 * 30
+
+# requests slower than this (ms) or running at least this many queries are logged
+# to "main_app.instrumentation" with the fingerprints of their slowest statements
+SQL_SLOW_REQUEST_MS = int(os.environ.get('SQL_SLOW_REQUEST_MS', 500))
+SQL_SLOW_QUERY_COUNT = int(os.environ.get('SQL_SLOW_QUERY_COUNT', 50))
+SQL_SLOWEST_STATEMENTS = 5
+# minutes of per-endpoint latency kept for /api/_metrics/
+SQL_METRICS_WINDOW_MINUTES = 15
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
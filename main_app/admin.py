@@ -18,4 +18,5 @@ class OrderItemInline(admin.TabularInline):
 class OrderAdmin(admin.ModelAdmin):
     list_display = ('id', 'customer_name', 'total_price', 'total_profit', 'order_date')
     inlines = [OrderItemInline]
+    readonly_fields = ('order_date',)
     search_fields = ('customer_name', 'customer_phone', 'id')
@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class MainAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'main_app'
+
+    def ready(self):
+        from .search import ensure_search_index
+        from . import signals  # noqa: F401
+        post_migrate.connect(ensure_search_index, sender=self)
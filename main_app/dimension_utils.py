@@ -0,0 +1,57 @@
+import re
+from decimal import Decimal, InvalidOperation
+from .search import normalize_text
+
+# "120", "120.5" and "۲٫۵" (persian decimal separator) after digit normalization; "/" separates
+# two dimensions ("120/80"), it is not a decimal mark
+_NUMBER = re.compile(r"\d+(?:[.٫]\d+)?")
+# anything larger is a typo and would overflow the numeric columns
+_MAX_VALUE = Decimal("999999")
+
+
+def parse_numbers(text):
+    if text is None:
+        return []
+    numbers = []
+    for match in _NUMBER.findall(normalize_text(str(text))):
+        try:
+            value = Decimal(match.replace("٫", "."))
+        except InvalidOperation:
+            continue
+        if value <= _MAX_VALUE:
+            numbers.append(value)
+    return numbers
+
+
+def parse_number(text):
+    numbers = parse_numbers(text)
+    return numbers[0] if numbers else None
+
+
+def parse_dimensions(length, width, size):
+    """Return (length_cm, width_cm, area_m2) parsed from the free-text dimension fields.
+
+    Handles plain numbers, "120x80" style pairs in any of the fields and a single
+    number in ``size``, which for carpets is the area in square meters ("۶ متری").
+    """
+    length_numbers = parse_numbers(length)
+    width_numbers = parse_numbers(width)
+    size_numbers = parse_numbers(size)
+
+    length_cm = length_numbers[0] if length_numbers else None
+    width_cm = width_numbers[0] if width_numbers else None
+    area_m2 = None
+
+    if width_cm is None and len(length_numbers) >= 2:
+        width_cm = length_numbers[1]
+
+    if len(size_numbers) >= 2:
+        length_cm = length_cm if length_cm is not None else size_numbers[0]
+        width_cm = width_cm if width_cm is not None else size_numbers[1]
+    elif len(size_numbers) == 1:
+        area_m2 = size_numbers[0]
+
+    if length_cm is not None and width_cm is not None:
+        area_m2 = (length_cm * width_cm / Decimal(10000)).quantize(Decimal("0.01"))
+
+    return length_cm, width_cm, area_m2
@@ -0,0 +1,52 @@
+import csv
+import tempfile
+from django.http import StreamingHttpResponse, FileResponse
+from openpyxl import Workbook
+
+CATALOG_FIELDS = [
+    "id", "serial_number", "name", "type", "branch", "description", "crop_sex",
+    "unit_price", "sale_price", "length", "width", "size",
+]
+EXPORT_CHUNK_SIZE = 2000
+
+
+class Echo:
+    """File-like object for csv.writer that hands each line back instead of buffering it."""
+    def write(self, value):
+        return value
+
+
+def _rows(queryset):
+    return queryset.values_list(*CATALOG_FIELDS).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def stream_catalog_csv(queryset, filename="products.csv"):
+    writer = csv.writer(Echo())
+
+    def lines():
+        # BOM so Excel opens the persian text as UTF-8
+        yield "\ufeff" + writer.writerow(CATALOG_FIELDS)
+        for row in _rows(queryset):
+            yield writer.writerow(["" if v is None else v for v in row])
+
+    response = StreamingHttpResponse(lines(), content_type="text/csv; charset=utf-8")
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+def stream_catalog_xlsx(queryset, filename="products.xlsx"):
+    # write_only keeps one row in memory; the zip container is assembled on disk
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("products")
+    sheet.append(CATALOG_FIELDS)
+    for row in _rows(queryset):
+        sheet.append([float(v) if f in ("unit_price", "sale_price") and v is not None else v
+                      for f, v in zip(CATALOG_FIELDS, row)])
+
+    output = tempfile.TemporaryFile()
+    workbook.save(output)
+    output.seek(0)
+    return FileResponse(
+        output, as_attachment=True, filename=filename,
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
@@ -0,0 +1,132 @@
+import json
+from django.http import HttpResponse
+from .jalali_utils import jalali_datetime_strings
+from .models import Product, OrderItem
+from .serializers import ProductSerializer, image_srcset
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+PRODUCT_VALUES = [
+    "id", "type", "branch", "serial_number", "name", "description", "unit_price", "sale_price",
+    "image", "image_variants", "image_status", "length", "width", "size", "crop_sex", "created_at", "updated_at",
+]
+ORDER_VALUES = [
+    "id", "customer_name", "customer_phone", "customer_city", "customer_state", "customer_region",
+    "customer_address", "total_price", "total_profit", "order_date",
+]
+
+
+def dumps(data):
+    """Same bytes as DRF's JSONRenderer with the default (compact, unicode) settings."""
+    if orjson is not None:
+        content = orjson.dumps(data)
+    else:
+        content = json.dumps(data, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+    # DRF escapes these two so the output is also valid javascript
+    return content.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+
+
+def decimal_string(value):
+    return None if value is None else f"{value:f}"
+
+
+def product_rows(rows, request):
+    """ProductSerializer's representation, built from ``.values(*PRODUCT_VALUES)`` rows."""
+    storage = Product._meta.get_field("image").storage
+    displays = {
+        "carpet": ProductSerializer.CARPET_BRANCHES_DISPLAY,
+        None: ProductSerializer.TABLEAU_BRANCHES_DISPLAY,
+    }
+    created = jalali_datetime_strings([row["created_at"] for row in rows])
+    updated = jalali_datetime_strings([row["updated_at"] for row in rows])
+
+    result = []
+    for row, created_at, updated_at in zip(rows, created, updated):
+        branch = row["branch"]
+        image = row["image"]
+        result.append({
+            "id": row["id"],
+            "type": row["type"],
+            "branch": branch,
+            "branch_display": displays.get(row["type"], displays[None]).get(branch, branch),
+            "serial_number": row["serial_number"],
+            "name": row["name"],
+            "description": row["description"],
+            "unit_price": decimal_string(row["unit_price"]),
+            "sale_price": decimal_string(row["sale_price"]),
+            "image": request.build_absolute_uri(storage.url(image)) if image else None,
+            "image_srcset": image_srcset(row["image_variants"], storage, request),
+            "image_status": row["image_status"],
+            "length": row["length"],
+            "width": row["width"],
+            "size": row["size"],
+            "crop_sex": row["crop_sex"],
+            "created_at": created_at,
+            "updated_at": updated_at,
+        })
+    return result
+
+
+def order_rows(rows, request):
+    """OrderListSerializer's representation, built from ``.values(*ORDER_VALUES)`` rows."""
+    names = {row["id"]: [] for row in rows}
+    # same ordering as the compact list's prefetch, so product_names come out identically
+    items = OrderItem.objects.filter(order_id__in=names).order_by(*OrderItem._meta.ordering)
+    for order_id, name in items.values_list("order_id", "product__name"):
+        names[order_id].append(name)
+    dates = jalali_datetime_strings([row["order_date"] for row in rows])
+
+    result = []
+    for row, order_date in zip(rows, dates):
+        product_names = names[row["id"]]
+        result.append({
+            "id": row["id"],
+            "customer_name": row["customer_name"],
+            "customer_phone": row["customer_phone"],
+            "customer_city": row["customer_city"],
+            "customer_state": row["customer_state"],
+            "customer_region": row["customer_region"],
+            "customer_address": row["customer_address"],
+            "total_price": decimal_string(row["total_price"]),
+            "total_profit": decimal_string(row["total_profit"]),
+            "order_date": order_date,
+            "item_count": len(product_names),
+            "product_names": product_names,
+        })
+    return result
+
+
+class FastListMixin:
+    """``?fast=1`` on list: rows from ``.values()`` and a direct JSON encode instead of the serializer.
+
+    Only for the default representation; ``?fields=`` is applied to the built rows.
+    """
+    fast_query_param = "fast"
+    fast_values = None
+    fast_rows = None
+    fast_fields = None
+
+    def use_fast_list(self, request):
+        return request.query_params.get(self.fast_query_param) in ("1", "true")
+
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_list(request):
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset()).prefetch_related(None)
+        # annotations (e.g. search_rank) are kept for keyset cursors
+        queryset = queryset.values(*self.fast_values, *queryset.query.annotations)
+        page = self.paginate_queryset(queryset)
+        rows = list(page if page is not None else queryset)
+        data = self.fast_rows(rows, request)
+
+        fields = self.requested_fields
+        if fields is not None:
+            keep = [name for name in self.fast_fields if name in fields]
+            data = [{name: row[name] for name in keep} for row in data]
+        if page is not None:
+            data = self.get_paginated_response(data).data
+        return HttpResponse(dumps(data), content_type="application/json")
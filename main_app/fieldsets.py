@@ -0,0 +1,44 @@
+def parse_list_param(request, name):
+    """``?name=a,b&name=c`` -> ``{"a", "b", "c"}``, or None when the parameter is absent."""
+    values = request.query_params.getlist(name)
+    if not values:
+        return None
+    return {part.strip() for value in values for part in value.split(",") if part.strip()}
+
+
+class SparseFieldsMixin:
+    """Serializer mixin: ``fields=`` keeps only the named fields (unknown names are ignored)."""
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop("fields", None)
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+class SparseFieldsetViewMixin:
+    """``?fields=`` on GET requests, handed to a serializer using SparseFieldsMixin."""
+    fields_query_param = "fields"
+    expand_query_param = "expand"
+
+    @property
+    def requested_fields(self):
+        if self.request is None or self.request.method != "GET":
+            return None
+        return parse_list_param(self.request, self.fields_query_param)
+
+    @property
+    def requested_expand(self):
+        if self.request is None:
+            return set()
+        return parse_list_param(self.request, self.expand_query_param) or set()
+
+    def wants_field(self, name):
+        fields = self.requested_fields
+        return fields is None or name in fields
+
+    def get_serializer(self, *args, **kwargs):
+        fields = self.requested_fields
+        if fields is not None:
+            kwargs.setdefault("fields", fields)
+        return super().get_serializer(*args, **kwargs)
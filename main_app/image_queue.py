@@ -0,0 +1,141 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.core.files.base import ContentFile
+from .report_cache import bump_catalog_version
+from .image_utils import process_variants
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+
+
+def _workers():
+    return getattr(settings, "IMAGE_WORKERS", 2)
+
+
+def _pool():
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            workers = _workers()
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="image")
+            # jobs beyond this stay pending in the database for `process_images`
+            _slots = threading.BoundedSemaphore(workers * 4)
+    return _executor, _slots
+
+
+def content_name(prefix, digest, ext):
+    return f"{prefix}/{digest[:2]}/{digest}.{ext}"
+
+
+def save_by_hash(storage, prefix, data, ext):
+    """Store ``data`` under a name derived from its SHA-256, writing it only if it is new.
+
+    Names never change content, so their URLs can be cached forever; unreferenced
+    files are removed by ``manage.py gc_images``.
+    """
+    name = content_name(prefix, hashlib.sha256(data).hexdigest(), ext)
+    if not storage.exists(name):
+        storage.save(name, ContentFile(data))
+    return name
+
+
+def set_pending(product, upload):
+    """Store the raw upload and mark the product for background processing.
+
+    If another product already has the processed result of identical bytes it is reused.
+    """
+    digest = hashlib.sha256()
+    for chunk in upload.chunks():
+        digest.update(chunk)
+    ext = os.path.splitext(upload.name)[1].lstrip(".").lower() or "bin"
+    name = content_name("products/uploads", digest.hexdigest(), ext)
+
+    storage = product.image_source.storage
+    if not storage.exists(name):
+        upload.seek(0)
+        storage.save(name, upload)
+    product.image_source = name
+
+    done = Product.objects.filter(image_source=name, image_status="ready").exclude(pk=product.pk).first()
+    if done is not None:
+        product.image = done.image.name
+        product.image_variants = done.image_variants
+        product.image_status = "ready"
+    else:
+        product.image_status = "pending"
+
+
+def enqueue_image(product_id):
+    """Process the product's image on the worker pool once the current transaction commits."""
+    if _workers() <= 0:
+        return
+    transaction.on_commit(lambda: _submit(product_id))
+
+
+def _submit(product_id):
+    executor, slots = _pool()
+    if not slots.acquire(blocking=False):
+        return
+
+    def run():
+        try:
+            process_product_image(product_id)
+        finally:
+            slots.release()
+            close_old_connections()
+
+    executor.submit(run)
+
+
+def save_variants(storage, rendered):
+    """Write every rendered file; returns the ``image_variants`` mapping of storage names."""
+    variants = {}
+    for name, variant in rendered.items():
+        files = {}
+        for ext, buffer in variant["files"].items():
+            files[ext] = save_by_hash(storage, "products/variants", buffer.getvalue(), ext)
+        variants[name] = {"width": variant["width"], "height": variant["height"], "files": files}
+    return variants
+
+
+def process_product_image(product_id):
+    """Encode the pending upload into its variants; returns the resulting status, or None if nothing to do."""
+    product = Product.objects.filter(pk=product_id, image_status="pending").first()
+    if product is None or not product.image_source:
+        return None
+    source = product.image_source.name
+    storage = product.image.storage
+
+    try:
+        with product.image_source.open("rb") as raw:
+            rendered = process_variants(raw)
+        variants = save_variants(storage, rendered)
+    except Exception:
+        logger.exception("image processing failed for product %s", product_id)
+        if Product.objects.filter(pk=product_id, image_status="pending", image_source=source).update(
+            image_status="failed", updated_at=timezone.now()
+        ):
+            bump_catalog_version()
+        return "failed"
+
+    # a newer upload may have replaced the source while we were encoding
+    updated = Product.objects.filter(pk=product_id, image_status="pending", image_source=source).update(
+        image=variants["card"]["files"]["webp"], image_variants=variants,
+        image_status="ready", updated_at=timezone.now(),
+    )
+    if not updated:
+        # the files may be shared with other products; gc_images removes them if they are not
+        return None
+    # queryset updates send no post_save
+    bump_catalog_version()
+    return "ready"
@@ -1,11 +1,24 @@
 from io import BytesIO
-from PIL import Image, ImageOps
+from PIL import Image, ImageOps, features
+from django.conf import settings
 from django.core.files.uploadedfile import InMemoryUploadedFile
 import sys
 
-def process_image(image_file, size=(300, 500), target_kb=100, format="WEBP"):
-    img = Image.open(image_file)
-    img = img.convert("RGBA")
+# name -> ((width, height), byte budget in KB); "card" is what `Product.image` has always held
+IMAGE_VARIANTS = {
+    "thumbnail": ((150, 250), 25),
+    "card": ((300, 500), 100),
+    "detail": ((600, 1000), 250),
+}
+# WEBP is required (it is what `Product.image` points at); AVIF is much slower to encode, so opt-in
+VARIANT_FORMATS = ["WEBP", "JPEG"]
+MIN_QUALITY = 30
+MAX_QUALITY = 90
+QUALITY_SEARCH_STEPS = 3
+
+
+def crop_resize(img, size):
+    """Center-crop ``img`` to the aspect ratio of ``size`` and resize to exactly ``size``."""
     target_w, target_h = size
     target_ratio = target_w / target_h
     w, h = img.size
@@ -18,21 +31,115 @@ def process_image(image_file, size=(300, 500), target_kb=100, format="WEBP"):
         new_h = int(w / target_ratio)
         offset = (h - new_h) // 2
         img = img.crop((0, offset, w, offset + new_h))
-    img = img.resize((target_w, target_h), Image.LANCZOS)
+    return img.resize((target_w, target_h), Image.LANCZOS)
 
+
+def _save(img, format, quality):
     buffer = BytesIO()
-    quality = 90
-    while True:
-        buffer.seek(0)
-        buffer.truncate()
-        img.save(buffer, format=format, quality=quality)
-
-        size_kb = buffer.tell() / 1024
-        if size_kb <= target_kb or quality <= 30:
-            break
-        quality -= 10
-
-    buffer.seek(0)
+    img.save(buffer, format=format, quality=quality)
+    return buffer
+
+
+def encode(img, format, target_kb):
+    """Encode at about the highest quality that fits ``target_kb``.
+
+    One encode when MAX_QUALITY already fits (most small variants). Otherwise up to
+    QUALITY_SEARCH_STEPS bisection encodes, which land within ~8 quality points of the
+    best fit, plus one at MIN_QUALITY when none of them fit.
+    """
+    if format == "JPEG" and img.mode != "RGB":
+        img = img.convert("RGB")
+    budget = target_kb * 1024
+    best = _save(img, format, MAX_QUALITY)
+    if best.tell() > budget:
+        best = None
+        low, high = MIN_QUALITY, MAX_QUALITY - 1
+        for _ in range(QUALITY_SEARCH_STEPS):
+            if low > high:
+                break
+            quality = (low + high) // 2
+            buffer = _save(img, format, quality)
+            if buffer.tell() <= budget:
+                best = buffer
+                low = quality + 1
+            else:
+                high = quality - 1
+        if best is None:
+            best = _save(img, format, MIN_QUALITY)
+    best.seek(0)
+    return best
+
+
+def open_image(image_file, size=None):
+    img = Image.open(image_file)
+    if size:
+        # lets the JPEG decoder downscale by 2/4/8 while decoding, never below ``size``
+        img.draft("RGB", size)
+    return img.convert("RGBA")
+
+
+def variant_formats():
+    formats = getattr(settings, "IMAGE_VARIANT_FORMATS", VARIANT_FORMATS)
+    return ["WEBP"] + [f for f in formats if f != "WEBP" and (f != "AVIF" or features.check("avif"))]
+
+
+def process_variants(image_file, variants=IMAGE_VARIANTS, formats=None):
+    """Decode once and encode every variant in every format.
+
+    Returns ``{name: {"width": w, "height": h, "files": {ext: BytesIO}}}``.
+    """
+    formats = formats or variant_formats()
+    ordered = sorted(variants.items(), key=lambda v: v[1][0][0] * v[1][0][1], reverse=True)
+    img = open_image(image_file, ordered[0][1][0])
+    result = {}
+    for name, (size, target_kb) in ordered:
+        # each variant is resized from the next larger one rather than the full upload
+        img = crop_resize(img, size)
+        result[name] = {
+            "width": size[0],
+            "height": size[1],
+            "files": {format.lower(): encode(img, format, target_kb) for format in formats},
+        }
+    return result
+
+
+RENDER_FORMATS = {"webp": "WEBP", "jpeg": "JPEG", "png": "PNG", "avif": "AVIF"}
+RENDER_QUALITY = 85
+MAX_RENDER_SIDE = 2000
+
+
+def render_format(fmt):
+    """``fmt``, or "webp" when this Pillow build can't encode it (AVIF is optional)."""
+    if fmt == "avif" and not features.check("avif"):
+        return "webp"
+    return fmt
+
+
+def render_size(image_file, width=None, height=None, fmt="webp"):
+    """Encoded bytes of the image cropped/resized to ``width`` x ``height``.
+
+    With only one side given the other follows the source aspect ratio.
+    """
+    img = Image.open(image_file)
+    if not width or not height:
+        w, h = img.size
+        width = width or max(1, round(height * w / h))
+        height = height or max(1, round(width * h / w))
+    width, height = min(width, MAX_RENDER_SIDE), min(height, MAX_RENDER_SIDE)
+    img.draft("RGB", (width, height))
+    img = crop_resize(img.convert("RGBA"), (width, height))
+
+    format = RENDER_FORMATS[render_format(fmt)]
+    if format == "JPEG":
+        img = img.convert("RGB")
+    buffer = BytesIO()
+    img.save(buffer, format=format, quality=RENDER_QUALITY)
+    return buffer.getvalue()
+
+
+def process_image(image_file, size=(300, 500), target_kb=100, format="WEBP"):
+    img = crop_resize(open_image(image_file, size), size)
+    buffer = encode(img, format, target_kb)
     new_file = InMemoryUploadedFile(
         buffer,
         None,
@@ -0,0 +1,393 @@
+import codecs
+import csv
+import json
+import time
+from datetime import datetime, time as dt_time
+from decimal import Decimal, InvalidOperation
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from persiantools.jdatetime import JalaliDateTime
+from .models import Product, Order, OrderItem, CROP_CHOICES
+from .report_cache import bump_sales_version, bump_catalog_version
+from .rollups import add_to_rollups, add_to_product_rollups
+from .search import normalize_text
+from .serializers import product_rule_error
+
+PRODUCT_FIELDS = ["name", "type", "branch", "description", "crop_sex", "unit_price", "sale_price", "length", "width", "size"]
+PRODUCT_REQUIRED_FIELDS = ["name", "type", "branch", "unit_price"]
+ORDER_FIELDS = ["customer_name", "customer_phone", "customer_city", "customer_state", "customer_region", "customer_address"]
+MAX_REJECTED_DETAILS = 100
+
+
+class RowError(Exception):
+    pass
+
+
+def read_rows(lines, fmt):
+    """Yield ``(line_number, row_dict)`` from an iterable of text lines, one at a time."""
+    if fmt == "csv":
+        reader = csv.DictReader(lines)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else {"__invalid__": "invalid JSON line"}
+
+
+def read_xlsx_rows(upload):
+    """Yield ``(row_number, row_dict)`` from the first sheet, using its first row as the header."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(upload, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(h).strip() if h is not None else "" for h in next(rows, ())]
+        for number, values in enumerate(rows, start=2):
+            if all(v is None for v in values):
+                continue
+            yield number, {h: v for h, v in zip(header, values) if h}
+    finally:
+        workbook.close()
+
+
+def parse_order_date(value):
+    """ISO gregorian dates/datetimes, or jalali in the API format ("1402/05/12 - 14:30" or "1402/05/12")."""
+    value = normalize_text(str(value or ""))
+    if not value:
+        raise RowError("order_date is required")
+
+    if "/" in value:
+        for fmt in ("%Y/%m/%d - %H:%M", "%Y/%m/%d %H:%M", "%Y/%m/%d"):
+            try:
+                parsed = JalaliDateTime.strptime(value, fmt).to_gregorian()
+                break
+            except ValueError:
+                continue
+        else:
+            raise RowError(f"invalid jalali date {value!r}")
+    else:
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise RowError(f"invalid date {value!r}")
+            parsed = datetime.combine(day, dt_time(12, 0))
+
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_decimal(value, name):
+    if value in (None, ""):
+        return None
+    try:
+        number = Decimal(normalize_text(str(value)).replace(",", ""))
+    except InvalidOperation:
+        raise RowError(f"{name} must be a number")
+    if number < 0:
+        raise RowError(f"{name} cannot be negative")
+    return number
+
+
+def group_orders(rows):
+    """Consecutive rows sharing an ``order_ref`` form one order; rows without one stand alone."""
+    group, ref = [], None
+    for number, row in rows:
+        row_ref = str(row.get("order_ref") or "").strip()
+        if group and (not row_ref or row_ref != ref):
+            yield group
+            group = []
+        group.append((number, row))
+        ref = row_ref
+    if group:
+        yield group
+
+
+class OrderImporter:
+    def __init__(self, chunk_size=1000):
+        self.chunk_size = chunk_size
+        self.lines = 0
+        self.orders = 0
+        self.items = 0
+        self.rejected = 0
+        self.rejected_details = []
+
+    def run(self, rows):
+        started = time.monotonic()
+        chunk = []
+        for group in group_orders(rows):
+            self.lines += len(group)
+            chunk.append(group)
+            if len(chunk) >= self.chunk_size:
+                self.import_chunk(chunk)
+                chunk = []
+        if chunk:
+            self.import_chunk(chunk)
+
+        elapsed = time.monotonic() - started
+        return {
+            "lines": self.lines,
+            "orders": self.orders,
+            "items": self.items,
+            "rejected": self.rejected,
+            "rejected_rows": self.rejected_details,
+            "seconds": round(elapsed, 3),
+            "lines_per_second": round(self.lines / elapsed) if elapsed else None,
+        }
+
+    def reject(self, group, reason):
+        self.rejected += len(group)
+        for number, _ in group:
+            if len(self.rejected_details) < MAX_REJECTED_DETAILS:
+                self.rejected_details.append({"line": number, "error": reason})
+
+    def load_products(self, chunk):
+        ids, serials = set(), set()
+        for group in chunk:
+            for _, row in group:
+                product = row.get("product_id") or row.get("product")
+                if product not in (None, ""):
+                    try:
+                        ids.add(int(product))
+                    except (TypeError, ValueError):
+                        pass
+                elif row.get("serial_number"):
+                    serials.add(str(row["serial_number"]).strip())
+
+        by_id = Product.objects.in_bulk(ids) if ids else {}
+        by_serial = {}
+        if serials:
+            for product in Product.objects.filter(serial_number__in=serials):
+                by_serial.setdefault(product.serial_number, product)
+        return by_id, by_serial
+
+    def build_item(self, row, by_id, by_serial):
+        if "__invalid__" in row:
+            raise RowError(row["__invalid__"])
+
+        product = row.get("product_id") or row.get("product")
+        if product not in (None, ""):
+            try:
+                product = by_id.get(int(product))
+            except (TypeError, ValueError):
+                raise RowError("product_id must be an integer")
+        elif row.get("serial_number"):
+            product = by_serial.get(str(row["serial_number"]).strip())
+        else:
+            raise RowError("product_id or serial_number is required")
+        if product is None:
+            raise RowError("product not found")
+
+        price = parse_decimal(row.get("price"), "price")
+        if price is None:
+            price = product.sale_price if product.sale_price is not None else product.unit_price
+        item = OrderItem(product=product, price=price, discount=parse_decimal(row.get("discount"), "discount") or Decimal("0.00"))
+        item.calculate()
+        return item
+
+    def import_chunk(self, chunk):
+        by_id, by_serial = self.load_products(chunk)
+        orders, items_per_order = [], []
+        rollup_deltas, product_deltas = {}, {}
+
+        for group in chunk:
+            try:
+                first = group[0][1]
+                if "__invalid__" in first:
+                    raise RowError(first["__invalid__"])
+                order_date = parse_order_date(first.get("order_date"))
+                items = [self.build_item(row, by_id, by_serial) for _, row in group]
+            except RowError as exc:
+                self.reject(group, str(exc))
+                continue
+
+            order = Order(
+                order_date=order_date,
+                total_price=sum((i.final_price for i in items), Decimal("0.00")),
+                total_profit=sum((i.profit for i in items), Decimal("0.00")),
+                **{f: str(first[f]).strip() for f in ORDER_FIELDS if first.get(f) not in (None, "")},
+            )
+            for item in items:
+                item.created_at = order_date
+            orders.append(order)
+            items_per_order.append(items)
+
+            delta = rollup_deltas.setdefault(timezone.localdate(order_date), {
+                "sales": Decimal("0.00"), "profit": Decimal("0.00"), "order_count": 0, "item_count": 0,
+            })
+            delta["sales"] += order.total_price
+            delta["profit"] += order.total_profit
+            delta["order_count"] += 1
+            delta["item_count"] += len(items)
+            for item in items:
+                sold = product_deltas.setdefault(item.product_id, {
+                    "sales_count": 0, "revenue": Decimal("0.00"), "profit": Decimal("0.00"), "last_sold": order_date,
+                })
+                sold["sales_count"] += 1
+                sold["revenue"] += item.final_price
+                sold["profit"] += item.profit
+                sold["last_sold"] = max(sold["last_sold"], order_date)
+
+        if not orders:
+            return
+
+        with transaction.atomic():
+            Order.objects.bulk_create(orders)
+            all_items = []
+            for order, items in zip(orders, items_per_order):
+                for item in items:
+                    item.order = order
+                    all_items.append(item)
+            OrderItem.objects.bulk_create(all_items, batch_size=1000)
+            # bulk inserts skip the per-order rollup update and the post_save signals; applied
+            # with the chunk, so a later failing chunk can't leave committed orders out of the totals
+            add_to_rollups(rollup_deltas)
+            add_to_product_rollups(product_deltas)
+            transaction.on_commit(bump_sales_version)
+
+        self.orders += len(orders)
+        self.items += len(all_items)
+
+
+class ProductImporter:
+    """Upsert catalog rows by ``serial_number`` with one lookup and two bulk writes per batch."""
+    def __init__(self, batch_size=500):
+        self.batch_size = batch_size
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.rejected = 0
+        self.rejected_details = []
+        self.type_keys = {key for key, _ in Product.TYPE_CHOICES}
+        self.crop_keys = {key for key, _ in CROP_CHOICES}
+
+    def run(self, rows):
+        started = time.monotonic()
+        batch = []
+        for number, row in rows:
+            self.rows += 1
+            batch.append((number, row))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = []
+        if batch:
+            self.import_batch(batch)
+
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "rejected": self.rejected,
+            "rejected_rows": self.rejected_details,
+            "seconds": round(time.monotonic() - started, 3),
+        }
+
+    def reject(self, number, reason):
+        self.rejected += 1
+        if len(self.rejected_details) < MAX_REJECTED_DETAILS:
+            self.rejected_details.append({"line": number, "error": reason})
+
+    def clean(self, row):
+        values = {}
+        for field in PRODUCT_FIELDS:
+            if field not in row:
+                continue
+            value = row[field]
+            if field in ("unit_price", "sale_price"):
+                value = parse_decimal(value, field)
+            elif value in (None, ""):
+                value = "" if field == "description" else None
+            else:
+                value = str(value).strip()
+            values[field] = value
+        return values
+
+    def import_batch(self, batch):
+        # the last row wins when a serial number repeats inside the batch
+        latest = {}
+        for number, row in batch:
+            if "__invalid__" in row:
+                self.reject(number, row["__invalid__"])
+                continue
+            serial = str(row.get("serial_number") or "").strip()
+            if not serial:
+                self.reject(number, "serial_number is required")
+                continue
+            if serial in latest:
+                self.reject(latest[serial][0], "duplicate serial_number, superseded by a later row")
+            latest[serial] = (number, row)
+
+        existing = {}
+        for product in Product.objects.filter(serial_number__in=latest.keys()).order_by("id"):
+            existing.setdefault(product.serial_number, product)
+
+        to_create, to_update, updated_fields = [], [], set()
+        now = timezone.now()
+        for serial, (number, row) in latest.items():
+            try:
+                values = self.clean(row)
+            except RowError as exc:
+                self.reject(number, str(exc))
+                continue
+
+            product = existing.get(serial)
+            if product is None:
+                missing = [f for f in PRODUCT_REQUIRED_FIELDS if values.get(f) in (None, "")]
+                if missing:
+                    self.reject(number, f"required: {', '.join(missing)}")
+                    continue
+                product = Product(serial_number=serial)
+            elif values.get("unit_price", product.unit_price) is None:
+                self.reject(number, "unit_price is required")
+                continue
+
+            merged = {f: values.get(f, getattr(product, f)) for f in PRODUCT_FIELDS}
+            if merged["type"] not in self.type_keys:
+                self.reject(number, f"invalid type {merged['type']!r}")
+                continue
+            if merged["crop_sex"] is not None and merged["crop_sex"] not in self.crop_keys:
+                self.reject(number, f"invalid crop_sex {merged['crop_sex']!r}")
+                continue
+            error = product_rule_error(merged["type"], merged["branch"], merged["size"], merged["length"], merged["width"])
+            if error:
+                self.reject(number, error)
+                continue
+
+            for field, value in merged.items():
+                setattr(product, field, value)
+            if product.pk is None:
+                to_create.append(product)
+            else:
+                product.updated_at = now
+                to_update.append(product)
+                updated_fields.update(values)
+
+        with transaction.atomic():
+            if to_create:
+                Product.objects.bulk_create(to_create)
+            if to_update:
+                # bulk_update skips auto_now, so updated_at is set above and written explicitly
+                Product.objects.bulk_update(to_update, sorted(updated_fields) + ["updated_at"])
+            if to_create or to_update:
+                transaction.on_commit(bump_catalog_version)
+
+        self.created += len(to_create)
+        self.updated += len(to_update)
+
+
+def import_products(upload, fmt, batch_size=500):
+    rows = read_xlsx_rows(upload) if fmt == "xlsx" else read_rows(codecs.iterdecode(upload, "utf-8-sig"), fmt)
+    return ProductImporter(batch_size=batch_size).run(rows)
+
+
+def import_orders(lines, fmt, chunk_size=1000):
+    return OrderImporter(chunk_size=chunk_size).run(read_rows(lines, fmt))
@@ -0,0 +1,177 @@
+import bisect
+import heapq
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+# request latency histogram bounds in ms; the last bucket is everything above
+LATENCY_BUCKETS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000]
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w\"])-?\d+(?:\.\d+)?\b")
+_IN_LISTS = re.compile(r"\bIN \((?:\s*\?\s*,)*\s*\?\s*\)", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def fingerprint(sql):
+    """The statement with literals replaced by ``?``, so repeats of one query shape group together."""
+    sql = _STRINGS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql).replace("%s", "?")
+    sql = _SPACES.sub(" ", sql).strip()
+    return _IN_LISTS.sub("IN (...)", sql)
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` callable keeping count, total time and the slowest statements."""
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.duration = 0.0
+        self.slowest = []
+        self._seq = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            self._seq += 1
+            entry = (elapsed, self._seq, sql)
+            if len(self.slowest) < self.keep:
+                heapq.heappush(self.slowest, entry)
+            elif elapsed > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+
+    def slowest_statements(self):
+        return [
+            {"ms": round(elapsed * 1000, 2), "fingerprint": fingerprint(sql)}
+            for elapsed, _, sql in sorted(self.slowest, reverse=True)
+        ]
+
+
+class EndpointStats:
+    """Per-endpoint latency histograms over a rolling window of one-minute slots (per process)."""
+    def __init__(self, minutes):
+        self.minutes = minutes
+        self.slots = deque()
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, ms, queries, db_ms):
+        minute = int(time.time() // 60)
+        with self.lock:
+            if not self.slots or self.slots[-1][0] != minute:
+                self.slots.append((minute, {}))
+            self._expire(minute)
+            stats = self.slots[-1][1].setdefault(endpoint, {
+                "count": 0, "buckets": [0] * (len(LATENCY_BUCKETS) + 1), "ms": 0.0, "queries": 0, "db_ms": 0.0,
+            })
+            stats["count"] += 1
+            stats["buckets"][bisect.bisect_left(LATENCY_BUCKETS, ms)] += 1
+            stats["ms"] += ms
+            stats["queries"] += queries
+            stats["db_ms"] += db_ms
+
+    def _expire(self, minute):
+        while self.slots and self.slots[0][0] <= minute - self.minutes:
+            self.slots.popleft()
+
+    def snapshot(self):
+        with self.lock:
+            self._expire(int(time.time() // 60))
+            merged = {}
+            for _, endpoints in self.slots:
+                for endpoint, stats in endpoints.items():
+                    total = merged.setdefault(endpoint, {
+                        "count": 0, "buckets": [0] * (len(LATENCY_BUCKETS) + 1), "ms": 0.0, "queries": 0, "db_ms": 0.0,
+                    })
+                    total["count"] += stats["count"]
+                    total["buckets"] = [a + b for a, b in zip(total["buckets"], stats["buckets"])]
+                    total["ms"] += stats["ms"]
+                    total["queries"] += stats["queries"]
+                    total["db_ms"] += stats["db_ms"]
+
+        labels = [f"<={bound}" for bound in LATENCY_BUCKETS] + [f">{LATENCY_BUCKETS[-1]}"]
+        result = {}
+        for endpoint, stats in sorted(merged.items()):
+            count = stats["count"]
+            result[endpoint] = {
+                "count": count,
+                "avg_ms": round(stats["ms"] / count, 2),
+                "p50_ms": _percentile(stats["buckets"], count, 0.5),
+                "p95_ms": _percentile(stats["buckets"], count, 0.95),
+                "avg_queries": round(stats["queries"] / count, 2),
+                "avg_db_ms": round(stats["db_ms"] / count, 2),
+                "histogram": dict(zip(labels, stats["buckets"])),
+            }
+        return {"window_minutes": self.minutes, "endpoints": result}
+
+
+def _percentile(buckets, count, fraction):
+    """Upper bound of the bucket holding the percentile (None when it is in the open last bucket)."""
+    seen = 0
+    for index, value in enumerate(buckets):
+        seen += value
+        if seen >= count * fraction:
+            return LATENCY_BUCKETS[index] if index < len(LATENCY_BUCKETS) else None
+    return None
+
+
+endpoint_stats = EndpointStats(settings.SQL_METRICS_WINDOW_MINUTES)
+
+
+def endpoint_name(request):
+    match = getattr(request, "resolver_match", None)
+    # router patterns are regexes; drop their anchors
+    route = match.route.replace("^", "").replace("$", "") if match else "<unresolved>"
+    return f"{request.method} /{route}"
+
+
+class SQLInstrumentationMiddleware:
+    """Times every statement of a request.
+
+    Adds ``X-DB-Queries`` and ``Server-Timing`` headers, logs slow or query-heavy
+    requests as one JSON line, and feeds the rolling histograms behind ``/api/_metrics``.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder(settings.SQL_SLOWEST_STATEMENTS)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.duration * 1000
+
+        response["X-DB-Queries"] = str(recorder.count)
+        response["Server-Timing"] = (
+            f'db;dur={db_ms:.1f};desc="{recorder.count} queries", app;dur={total_ms - db_ms:.1f}, total;dur={total_ms:.1f}'
+        )
+
+        endpoint = endpoint_name(request)
+        endpoint_stats.record(endpoint, total_ms, recorder.count, db_ms)
+        if total_ms >= settings.SQL_SLOW_REQUEST_MS or recorder.count >= settings.SQL_SLOW_QUERY_COUNT:
+            logger.warning(json.dumps({
+                "event": "slow_request",
+                "endpoint": endpoint,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "ms": round(total_ms, 2),
+                "db_ms": round(db_ms, 2),
+                "queries": recorder.count,
+                "slowest": recorder.slowest_statements(),
+            }, ensure_ascii=False))
+        return response
@@ -0,0 +1,64 @@
+import functools
+from datetime import timedelta
+from persiantools.jdatetime import JalaliDate
+from .models import DateDimension
+
+# distinct days kept converted; orders and reports cluster on a few thousand at most
+JALALI_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=JALALI_CACHE_SIZE)
+def to_jalali_date(day):
+    return JalaliDate.to_jalali(day)
+
+
+@functools.lru_cache(maxsize=JALALI_CACHE_SIZE)
+def jalali_date_label(day):
+    return to_jalali_date(day).strftime("%Y/%m/%d")
+
+
+def format_jalali_datetime(value):
+    """``"%Y/%m/%d - %H:%M"`` in the datetime's own timezone; only the date goes through the calendar."""
+    if not value:
+        return None
+    return f"{jalali_date_label(value.date())} - {value.hour:02d}:{value.minute:02d}"
+
+
+def jalali_datetime_strings(values):
+    return [format_jalali_datetime(value) for value in values]
+
+
+def jalali_months_ago(day, months):
+    """Gregorian date of the first day of the jalali month ``months`` months before ``day``."""
+    j = to_jalali_date(day)
+    index = j.year * 12 + j.month - 1 - months
+    return JalaliDate(index // 12, index % 12 + 1, 1).to_gregorian()
+
+
+def jalali_years_ago(day, years):
+    """Gregorian date of 1 Farvardin, ``years`` jalali years before ``day``."""
+    return JalaliDate(to_jalali_date(day).year - years, 1, 1).to_gregorian()
+
+
+def date_dimension_rows(start, end):
+    rows = []
+    day = start
+    while day <= end:
+        j = to_jalali_date(day)
+        rows.append(DateDimension(
+            date=day,
+            jalali_year=j.year,
+            jalali_month=j.month,
+            jalali_day=j.day,
+            jalali_week=j.week_of_year(),
+            jalali_quarter=(j.month - 1) // 3 + 1,
+        ))
+        day += timedelta(days=1)
+    return rows
+
+
+def fill_date_dimension(start, end):
+    """Insert the missing DateDimension rows between ``start`` and ``end`` (inclusive)."""
+    rows = date_dimension_rows(start, end)
+    DateDimension.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
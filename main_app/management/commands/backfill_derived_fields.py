@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from main_app.models import Product, Order
+
+
+class Command(BaseCommand):
+    help = "Recompute derived columns (search_text, parsed product dimensions) in chunks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        chunk_size = options["chunk_size"]
+        for model in (Product, Order):
+            updated = self.backfill(model, chunk_size)
+            self.stdout.write(f"{model.__name__}: {updated} rows updated")
+
+    def backfill(self, model, chunk_size):
+        sources = model.derived_sources()
+        derived = list(sources)
+        fields = {"id", *derived}
+        for names in sources.values():
+            fields.update(names)
+
+        last_id = 0
+        updated = 0
+        while True:
+            chunk = list(model.objects.only(*fields).filter(id__gt=last_id).order_by("id")[:chunk_size])
+            if not chunk:
+                return updated
+
+            changed = []
+            for obj in chunk:
+                before = [getattr(obj, f) for f in derived]
+                obj.fill_derived_fields()
+                if [getattr(obj, f) for f in derived] != before:
+                    changed.append(obj)
+
+            if changed:
+                with transaction.atomic():
+                    model.objects.bulk_update(changed, derived)
+                updated += len(changed)
+            last_id = chunk[-1].id
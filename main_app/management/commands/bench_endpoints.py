@@ -0,0 +1,186 @@
+import json
+import math
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import time
+import tracemalloc
+from datetime import timedelta
+from django import get_version
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver
+from django.utils import timezone
+from main_app.models import Product, Order
+from main_app.report_cache import bump_sales_version
+from main_app.views import ReportsViewSet
+
+# query strings for report actions that need parameters
+REPORT_PARAMS = {
+    "sales_range": lambda today: f"?start={today - timedelta(days=90)}&end={today}",
+    "chart_sales": lambda today: "?period=month",
+}
+
+
+def report_urls():
+    """One URL per ReportsViewSet action routed in the urlconf (aliases are skipped)."""
+    urls = {}
+
+    def walk(patterns, prefix):
+        for pattern in patterns:
+            if hasattr(pattern, "url_patterns"):
+                walk(pattern.url_patterns, prefix + str(pattern.pattern))
+                continue
+            view = pattern.callback
+            if getattr(view, "cls", None) is ReportsViewSet:
+                for action in view.actions.values():
+                    urls.setdefault(action, "/" + prefix + str(pattern.pattern))
+
+    walk(get_resolver().url_patterns, "")
+    return urls
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Time product, order and report endpoints through the test client and write p50/p95 latency, "
+        "queries per request and peak memory to a JSON file. Run `seed_bench` first."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--warmup", type=int, default=2)
+        parser.add_argument("--output", default="bench.json")
+        parser.add_argument("--compare", help="earlier output file to print p50 changes against")
+        parser.add_argument("--only", help="run only cases whose name contains this")
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.values_list("id", flat=True)[:500])
+        if not product_ids:
+            raise CommandError("no products; run `manage.py seed_bench` first")
+        self.rng = random.Random(0)
+        self.product_ids = product_ids
+        self.client = Client(raise_request_exception=False)
+
+        results = {}
+        for name, method, url, cold in self.cases():
+            if options["only"] and options["only"] not in name:
+                continue
+            results[name] = self.run_case(method, url, cold, options["repeat"], options["warmup"])
+            r = results[name]
+            self.stdout.write(
+                f"{name:<28} {r['status']}  p50 {r['p50_ms']:>8.2f} ms  p95 {r['p95_ms']:>8.2f} ms  "
+                f"{r['queries']:>3} queries  {r['peak_kb']:>8.0f} KB"
+            )
+
+        report = {
+            "meta": {
+                "commit": git_commit(),
+                "time": timezone.now().isoformat(),
+                "python": platform.python_version(),
+                "django": get_version(),
+                "database": connection.vendor,
+                "products": Product.objects.count(),
+                "orders": Order.objects.count(),
+                "repeat": options["repeat"],
+                # ru_maxrss is in KB on linux
+                "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            },
+            "results": results,
+        }
+        with open(options["output"], "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        self.stdout.write(f"wrote {options['output']}")
+
+        if options["compare"]:
+            self.compare(options["compare"], results)
+
+    def cases(self):
+        """``(name, method, url, cold)``; ``cold`` cases bust the report cache before every request."""
+        today = timezone.localdate()
+        cases = [
+            ("products.list", "GET", "/api/products/", False),
+            ("products.list.fast", "GET", "/api/products/?fast=1", False),
+            ("products.filter", "GET", "/api/products/?type=carpet&branch=tabriz&sort=price_low", False),
+            ("products.search", "GET", "/api/products/?search=تبریز", False),
+            ("products.cursor", "GET", "/api/products/?pagination=cursor&page_size=100", False),
+            ("orders.list", "GET", "/api/orders/", False),
+            ("orders.search", "GET", "/api/orders/?search=محمدی", False),
+            ("orders.create", "POST", "/api/orders/", False),
+        ]
+        for action, url in sorted(report_urls().items()):
+            params = REPORT_PARAMS.get(action)
+            cases.append((f"reports.{action}", "GET", url + (params(today) if params else ""), True))
+        return cases
+
+    def request(self, method, url):
+        if method == "POST":
+            items = [{"product": self.rng.choice(self.product_ids)} for _ in range(self.rng.randint(1, 4))]
+            body = {"customer_name": "bench", "customer_city": "تهران", "customer_region": "3", "items": items}
+            return self.client.post(url, body, content_type="application/json")
+        return self.client.get(url)
+
+    def run_case(self, method, url, cold, repeat, warmup):
+        for _ in range(warmup):
+            self.request(method, url)
+
+        timings = []
+        for _ in range(repeat):
+            if cold:
+                bump_sales_version()
+            started = time.perf_counter()
+            response = self.request(method, url)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        # one more request, outside the timed loop, for query count and allocations
+        if cold:
+            bump_sales_version()
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                self.request(method, url)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            "method": method,
+            "url": url,
+            "status": response.status_code,
+            "p50_ms": round(statistics.median(timings), 3),
+            "p95_ms": round(percentile(timings, 0.95), 3),
+            "mean_ms": round(statistics.fmean(timings), 3),
+            "queries": len(ctx.captured_queries),
+            "peak_kb": round(peak / 1024, 1),
+        }
+
+    def compare(self, path, results):
+        with open(path, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        self.stdout.write(f"p50 against {path}:")
+        for name, result in results.items():
+            old = baseline.get(name)
+            if old is None:
+                continue
+            ratio = result["p50_ms"] / old["p50_ms"] if old["p50_ms"] else float("inf")
+            self.stdout.write(
+                f"{name:<28} {old['p50_ms']:>8.2f} -> {result['p50_ms']:>8.2f} ms (x{ratio:.2f}), "
+                f"queries {old['queries']} -> {result['queries']}"
+            )
@@ -0,0 +1,34 @@
+import statistics
+import time
+from django.core.management.base import BaseCommand
+from django.test import Client
+
+URLS = ["/api/products/", "/api/products/?page_size=100&pagination=cursor", "/api/orders/"]
+
+
+class Command(BaseCommand):
+    help = "Compare list latency of the serializer path and ?fast=1, and check both return the same bytes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeat", type=int, default=30)
+        parser.add_argument("urls", nargs="*", default=URLS)
+
+    def handle(self, *args, **options):
+        client = Client()
+        for url in options["urls"]:
+            fast_url = url + ("&" if "?" in url else "?") + "fast=1"
+            slow, slow_ms = self.measure(client, url, options["repeat"])
+            fast, fast_ms = self.measure(client, fast_url, options["repeat"])
+            same = slow == fast.replace(b"&fast=1", b"").replace(b"fast=1&", b"").replace(b"?fast=1", b"")
+            self.stdout.write(
+                f"{url}: serializer {slow_ms:.1f} ms, fast {fast_ms:.1f} ms, "
+                f"x{slow_ms / fast_ms:.1f}, {len(slow)} bytes, identical={same}"
+            )
+
+    def measure(self, client, url, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            response = client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        return response.content, statistics.median(timings)
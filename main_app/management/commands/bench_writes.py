@@ -0,0 +1,59 @@
+import multiprocessing
+import random
+import time
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from main_app.models import Product
+
+
+def _worker(product_ids, orders, seed, results):
+    # forked children must not share the parent's database connection
+    connections.close_all()
+    rng = random.Random(seed)
+    client = Client(raise_request_exception=False)
+    ok = failed = 0
+    for _ in range(orders):
+        items = [{"product": rng.choice(product_ids)} for _ in range(rng.randint(1, 4))]
+        response = client.post("/api/orders/", {"customer_name": "bench", "items": items}, content_type="application/json")
+        if response.status_code == 201:
+            ok += 1
+        else:
+            failed += 1
+    connections.close_all()
+    results.put((ok, failed))
+
+
+class Command(BaseCommand):
+    help = "Create orders through the API from several processes at once and report write throughput."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--orders", type=int, default=200, help="orders per worker")
+
+    def handle(self, *args, **options):
+        product_ids = list(Product.objects.values_list("id", flat=True)[:500])
+        if not product_ids:
+            raise CommandError("no products; run seed data first")
+        connections.close_all()
+
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        workers = [
+            context.Process(target=_worker, args=(product_ids, options["orders"], seed, results))
+            for seed in range(options["workers"])
+        ]
+        started = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        totals = [results.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - started
+
+        ok = sum(t[0] for t in totals)
+        failed = sum(t[1] for t in totals)
+        self.stdout.write(
+            f"{options['workers']} workers: {ok} orders in {elapsed:.2f}s "
+            f"({ok / elapsed:.0f}/s), {failed} failed"
+        )
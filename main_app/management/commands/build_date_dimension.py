@@ -0,0 +1,25 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.utils import timezone
+from main_app.models import Order
+from main_app.jalali_utils import fill_date_dimension
+
+
+class Command(BaseCommand):
+    help = "Fill the gregorian -> jalali date dimension used by calendar=jalali reports."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="first day (default: first order)")
+        parser.add_argument("--end", type=date.fromisoformat, help="last day (default: end of next year)")
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        start = options["start"]
+        if start is None:
+            first_order = Order.objects.aggregate(first=Min("order_date"))["first"]
+            start = timezone.localdate(first_order) if first_order else today.replace(month=1, day=1)
+        end = options["end"] or date(today.year + 1, 12, 31)
+
+        count = fill_date_dimension(start, end)
+        self.stdout.write(f"date dimension covers {start} .. {end} ({count} days)")
@@ -0,0 +1,52 @@
+from datetime import timedelta
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from main_app.models import Product
+
+
+def walk(storage, path):
+    dirs, files = storage.listdir(path)
+    for name in files:
+        yield f"{path}/{name}"
+    for name in dirs:
+        yield from walk(storage, f"{path}/{name}")
+
+
+class Command(BaseCommand):
+    help = "Delete product image files no product references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="only list what would be deleted")
+        parser.add_argument(
+            "--grace-hours", type=float, default=24,
+            help="keep files younger than this; a worker may not have saved its product yet",
+        )
+
+    def handle(self, *args, **options):
+        storage = default_storage
+        referenced = set()
+        rows = Product.objects.values_list("image", "image_source", "image_variants")
+        for image, source, variants in rows.iterator(chunk_size=2000):
+            referenced.update(name for name in (image, source) if name)
+            for variant in (variants or {}).values():
+                referenced.update(variant["files"].values())
+
+        cutoff = timezone.now() - timedelta(hours=options["grace_hours"])
+        deleted = freed = 0
+        if not storage.exists("products"):
+            self.stdout.write("nothing to collect")
+            return
+        for name in walk(storage, "products"):
+            if name in referenced or storage.get_modified_time(name) > cutoff:
+                continue
+            size = storage.size(name)
+            if options["dry_run"]:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+            deleted += 1
+            freed += size
+
+        verb = "would delete" if options["dry_run"] else "deleted"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {deleted} files ({freed / 1024 / 1024:.1f} MB)"))
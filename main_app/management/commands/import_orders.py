@@ -0,0 +1,33 @@
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from main_app.importers import import_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Import historical orders from a CSV or JSONL file, one order line per row. "
+        "Columns: order_ref, order_date, customer_*, product_id or serial_number, price, discount."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+        parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="orders per transaction")
+
+    def handle(self, *args, **options):
+        path = Path(options["path"])
+        if not path.exists():
+            raise CommandError(f"{path} does not exist")
+        fmt = options["format"] or ("csv" if path.suffix.lower() == ".csv" else "jsonl")
+
+        with path.open(encoding="utf-8-sig", newline="") as f:
+            stats = import_orders(f, fmt, chunk_size=options["chunk_size"])
+
+        self.stdout.write(
+            f"{stats['orders']} orders / {stats['items']} items from {stats['lines']} lines "
+            f"in {stats['seconds']}s ({stats['lines_per_second']} lines/s)"
+        )
+        if stats["rejected"]:
+            self.stdout.write(self.style.WARNING(f"{stats['rejected']} lines rejected"))
+            for row in stats["rejected_rows"]:
+                self.stdout.write(f"  line {row['line']}: {row['error']}")
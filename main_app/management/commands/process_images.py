@@ -0,0 +1,43 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from main_app.report_cache import bump_catalog_version
+from main_app.image_queue import process_product_image
+from main_app.models import Product
+
+
+def _process(product_id):
+    try:
+        return process_product_image(product_id)
+    finally:
+        close_old_connections()
+
+
+class Command(BaseCommand):
+    help = "Process product images still pending (e.g. after a worker restart), optionally polling for new ones."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4)
+        parser.add_argument("--retry-failed", action="store_true", help="queue failed images again first")
+        parser.add_argument("--interval", type=float, help="keep polling every N seconds instead of exiting")
+
+    def handle(self, *args, **options):
+        if options["retry_failed"]:
+            retried = Product.objects.filter(image_status="failed").exclude(image_source="").update(image_status="pending")
+            if retried:
+                bump_catalog_version()
+            self.stdout.write(f"{retried} failed images queued again")
+
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            while True:
+                ids = list(Product.objects.filter(image_status="pending").order_by("id").values_list("id", flat=True))
+                results = list(pool.map(_process, ids))
+                if ids:
+                    self.stdout.write(
+                        f"{results.count('ready')} ready, {results.count('failed')} failed, "
+                        f"{results.count(None)} skipped"
+                    )
+                if options["interval"] is None:
+                    return
+                time.sleep(options["interval"])
@@ -0,0 +1,45 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from main_app.models import DailySalesRollup
+from main_app.rollups import compute_rollups, rebuild_rollups
+
+FIELDS = ["sales", "profit", "order_count", "item_count"]
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily sales rollup from orders, or report drift with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start", type=date.fromisoformat, help="first day (YYYY-MM-DD)")
+        parser.add_argument("--end", type=date.fromisoformat, help="last day (YYYY-MM-DD)")
+        parser.add_argument("--check", action="store_true", help="only report days that differ")
+
+    def handle(self, *args, **options):
+        start, end = options["start"], options["end"]
+
+        if not options["check"]:
+            count = rebuild_rollups(start, end)
+            self.stdout.write(f"rebuilt {count} days")
+            return
+
+        expected = compute_rollups(start, end)
+        stored = DailySalesRollup.objects.all()
+        if start:
+            stored = stored.filter(date__gte=start)
+        if end:
+            stored = stored.filter(date__lte=end)
+        stored = {r.date: r for r in stored}
+
+        mismatches = 0
+        for day in sorted(set(expected) | set(stored)):
+            want = expected.get(day, DailySalesRollup(date=day))
+            have = stored.get(day, DailySalesRollup(date=day))
+            diff = {f: (getattr(have, f), getattr(want, f)) for f in FIELDS if getattr(have, f) != getattr(want, f)}
+            if diff:
+                mismatches += 1
+                self.stdout.write(f"{day}: " + ", ".join(f"{f} {a} != {b}" for f, (a, b) in diff.items()))
+
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f"{mismatches} days differ, run without --check to fix"))
+        else:
+            self.stdout.write(self.style.SUCCESS("rollup matches orders"))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+from main_app.models import ProductSalesRollup
+from main_app.rollups import compute_product_rollups, rebuild_product_rollups
+
+FIELDS = ["sales_count", "revenue", "profit", "last_sold"]
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-product sales totals from order items, or report drift with --check."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--check", action="store_true", help="only report products that differ")
+
+    def handle(self, *args, **options):
+        if not options["check"]:
+            count = rebuild_product_rollups()
+            self.stdout.write(f"rebuilt {count} products")
+            return
+
+        expected = compute_product_rollups()
+        stored = ProductSalesRollup.objects.in_bulk()
+
+        mismatches = 0
+        for pk in sorted(set(expected) | set(stored)):
+            want = expected.get(pk, ProductSalesRollup(product_id=pk))
+            have = stored.get(pk, ProductSalesRollup(product_id=pk))
+            # a row left at zero by deleted orders is the same as no row, apart from last_sold
+            fields = FIELDS if pk in expected else FIELDS[:-1]
+            diff = {f: (getattr(have, f), getattr(want, f)) for f in fields if getattr(have, f) != getattr(want, f)}
+            if diff:
+                mismatches += 1
+                self.stdout.write(f"product {pk}: " + ", ".join(f"{f} {a} != {b}" for f, (a, b) in diff.items()))
+
+        if mismatches:
+            self.stdout.write(self.style.WARNING(f"{mismatches} products differ, run without --check to fix"))
+        else:
+            self.stdout.write(self.style.SUCCESS("product totals match orders"))
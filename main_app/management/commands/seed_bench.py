@@ -0,0 +1,154 @@
+import random
+import time
+from datetime import timedelta
+from decimal import Decimal
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from main_app.jalali_utils import fill_date_dimension
+from main_app.models import Product, Order, OrderItem, DailySalesRollup, CARPET_BRANCHES, TABLEAU_BRANCHES, CROP_CHOICES
+from main_app.report_cache import bump_sales_version, bump_catalog_version
+from main_app.rollups import rebuild_rollups, rebuild_product_rollups
+
+FIRST_NAMES = [
+    "علی", "محمد", "حسین", "رضا", "مهدی", "امیر", "سعید", "حمید", "مجید", "ناصر",
+    "فاطمه", "زهرا", "مریم", "سارا", "نرگس", "لیلا", "مینا", "الهام", "شیرین", "پریسا",
+]
+LAST_NAMES = [
+    "محمدی", "حسینی", "احمدی", "رضایی", "کریمی", "موسوی", "جعفری", "صادقی", "رحیمی", "فلاح",
+    "عباسی", "نوری", "قاسمی", "کاظمی", "تهرانی", "اصفهانی", "شیرازی", "هاشمی", "سعادت", "یزدانی",
+]
+STREETS = ["ولیعصر", "انقلاب", "آزادی", "شریعتی", "پاسداران", "ستارخان", "نیاوران", "جمهوری", "فاطمی", "مطهری"]
+# (city, state); most orders come from tehran, where customer_region is the municipal district
+OTHER_CITIES = [("کرج", "البرز"), ("قم", "قم"), ("اصفهان", "اصفهان"), ("شیراز", "فارس"), ("تبریز", "آذربایجان شرقی")]
+CARPET_SIZES = ["1", "1.5", "2", "3", "4", "6", "9", "12"]
+TABLEAU_SIZES = [(30, 40), (40, 60), (50, 70), (60, 90), (70, 100), (100, 150)]
+CHUNK_SIZE = 2000
+
+
+class Command(BaseCommand):
+    help = "Generate synthetic products and several years of orders with bulk_create, for benchmarks."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=2000)
+        parser.add_argument("--orders", type=int, default=20000)
+        parser.add_argument("--years", type=int, default=3, help="orders are spread over this many years up to now")
+        parser.add_argument("--max-items", type=int, default=4, help="largest basket size")
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--flush", action="store_true", help="delete all products, orders and rollups first")
+        parser.add_argument(
+            "--noinput", "--no-input", action="store_false", dest="interactive",
+            help="do not ask for confirmation before --flush",
+        )
+
+    def handle(self, *args, **options):
+        if options["products"] < 1 or options["orders"] < 0:
+            raise CommandError("--products must be at least 1 and --orders non-negative")
+        rng = random.Random(options["seed"])
+        started = time.perf_counter()
+
+        if options["flush"]:
+            if options["interactive"]:
+                confirm = input(
+                    "This will IRREVERSIBLY DELETE every product, order and sales rollup in the "
+                    f"\"{connection.settings_dict['NAME']}\" database.\n"
+                    "Type 'yes' to continue, or 'no' to cancel: "
+                )
+                if confirm != "yes":
+                    raise CommandError("flush cancelled")
+            with transaction.atomic():
+                OrderItem.objects.all().delete()
+                Order.objects.all().delete()
+                Product.objects.all().delete()
+                DailySalesRollup.objects.all().delete()
+
+        products = self.create_products(rng, options["products"])
+        end = timezone.localtime()
+        start = end - timedelta(days=365 * options["years"])
+        items = self.create_orders(rng, products, options["orders"], options["max_items"], start, end)
+
+        rebuild_rollups()
+        rebuild_product_rollups()
+        fill_date_dimension(start.date(), end.date())
+        bump_sales_version()
+        bump_catalog_version()
+        self.stdout.write(
+            f"{len(products)} products, {options['orders']} orders / {items} items "
+            f"in {time.perf_counter() - started:.1f}s"
+        )
+
+    def create_products(self, rng, count):
+        branches = [("carpet", b) for b, _ in CARPET_BRANCHES] + [("tableau", b) for b, _ in TABLEAU_BRANCHES]
+        labels = dict(CARPET_BRANCHES + TABLEAU_BRANCHES)
+        prefix = f"BENCH-{int(time.time())}"
+        products = []
+        for i in range(count):
+            # round robin so every branch of both types is populated
+            kind, branch = branches[i % len(branches)]
+            unit_price = Decimal(rng.randrange(2_000_000, 400_000_000, 50_000))
+            product = Product(
+                type=kind,
+                branch=branch,
+                serial_number=f"{prefix}-{i}",
+                name=f"{'فرش' if kind == 'carpet' else 'تابلو فرش'} {labels[branch]} {i}",
+                description=rng.choice(["", "دستباف", "کرک و ابریشم", "رنگ گیاهی", "نقشه لچک ترنج"]),
+                unit_price=unit_price,
+                sale_price=(unit_price * Decimal(rng.choice(["1.2", "1.3", "1.5"]))).quantize(Decimal("1")),
+            )
+            if kind == "carpet":
+                product.size = rng.choice(CARPET_SIZES)
+                product.crop_sex = rng.choice([None, *(c for c, _ in CROP_CHOICES)])
+            else:
+                length, width = rng.choice(TABLEAU_SIZES)
+                product.length, product.width = str(length), str(width)
+            products.append(product)
+        return Product.objects.bulk_create(products, batch_size=1000)
+
+    def create_orders(self, rng, products, count, max_items, start, end):
+        span = (end - start).total_seconds()
+        # a few best sellers so per-product reports have a realistic skew
+        weights = [rng.paretovariate(1.5) for _ in products]
+        item_total = 0
+        for offset in range(0, count, CHUNK_SIZE):
+            orders, baskets = [], []
+            for _ in range(min(CHUNK_SIZE, count - offset)):
+                order_date = start + timedelta(seconds=rng.uniform(0, span))
+                items = []
+                for product in rng.choices(products, weights, k=rng.randint(1, max_items)):
+                    price = product.sale_price or product.unit_price
+                    discount = (price * Decimal(rng.choice(["0", "0", "0.05", "0.1"]))).quantize(Decimal("1"))
+                    item = OrderItem(product=product, price=price, discount=discount, created_at=order_date)
+                    item.calculate()
+                    items.append(item)
+                orders.append(Order(
+                    order_date=order_date,
+                    total_price=sum(i.final_price for i in items),
+                    total_profit=sum(i.profit for i in items),
+                    **self.customer(rng),
+                ))
+                baskets.append(items)
+
+            with transaction.atomic():
+                Order.objects.bulk_create(orders)
+                all_items = []
+                for order, items in zip(orders, baskets):
+                    for item in items:
+                        item.order = order
+                        all_items.append(item)
+                OrderItem.objects.bulk_create(all_items, batch_size=1000)
+            item_total += len(all_items)
+        return item_total
+
+    def customer(self, rng):
+        if rng.random() < 0.8:
+            city, state, region = "تهران", "تهران", str(rng.randint(1, 22))
+        else:
+            (city, state), region = rng.choice(OTHER_CITIES), None
+        return {
+            "customer_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+            "customer_phone": f"09{rng.randint(10, 39)}{rng.randint(0, 9999999):07d}",
+            "customer_city": city,
+            "customer_state": state,
+            "customer_region": region,
+            "customer_address": f"{city}، خیابان {rng.choice(STREETS)}، پلاک {rng.randint(1, 300)}",
+        }
@@ -1,6 +1,9 @@
 from django.db import models
 from django.db.models import CheckConstraint, Q
+from django.utils import timezone
 from decimal import Decimal
+from .search import normalize_text
+from .dimension_utils import parse_dimensions
 
 # branch lists
 CARPET_BRANCHES = [
@@ -34,11 +37,62 @@ TABLEAU_BRANCHES = [
     ("manzare", "منظره"),
 ]
 
+IMAGE_STATUS_CHOICES = [
+    ("pending", "در صف پردازش"),
+    ("ready", "آماده"),
+    ("failed", "ناموفق"),
+]
+
 CROP_CHOICES = [("chele nakh abrisham", "چله نخ ابریشم"),
                 ("chele abrisham", "چله ابریشم"),
             ]
 
-class Product(models.Model):
+class DerivedFieldsQuerySet(models.QuerySet):
+    # bulk writes skip save(), so derived columns are filled in here as well
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.fill_derived_fields()
+        return super().bulk_create(objs, *args, **kwargs)
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs = list(objs)
+        fields = list(fields)
+        derived = self.model.derived_fields_for(fields)
+        if derived:
+            for obj in objs:
+                obj.fill_derived_fields()
+            fields += [f for f in derived if f not in fields]
+        return super().bulk_update(objs, fields, *args, **kwargs)
+
+
+class DerivedFieldsMixin:
+    SEARCH_FIELDS = []
+
+    # derived column -> fields it is computed from
+    @classmethod
+    def derived_sources(cls):
+        return {"search_text": cls.SEARCH_FIELDS}
+
+    @classmethod
+    def derived_fields_for(cls, fields):
+        return [name for name, sources in cls.derived_sources().items() if set(sources) & set(fields)]
+
+    def build_search_text(self):
+        return normalize_text(" ".join(str(getattr(self, f) or "") for f in self.SEARCH_FIELDS))
+
+    def fill_derived_fields(self):
+        self.search_text = self.build_search_text()
+
+    def save(self, *args, **kwargs):
+        self.fill_derived_fields()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = set(update_fields) | set(self.derived_fields_for(update_fields))
+        super().save(*args, **kwargs)
+
+
+class Product(DerivedFieldsMixin, models.Model):
     TYPE_CHOICES = [
         ('carpet', 'فرش'),
         ('tableau', 'تابلو فرش'),
@@ -54,9 +108,18 @@ class Product(models.Model):
     unit_price = models.DecimalField(max_digits=12, decimal_places=2)
     sale_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
     image = models.ImageField(upload_to='products/', null=True, blank=True)
+    # the upload as received; `image` is filled from it by the background worker
+    image_source = models.FileField(upload_to='products/uploads/', null=True, blank=True, editable=False)
+    image_status = models.CharField(max_length=10, choices=IMAGE_STATUS_CHOICES, null=True, blank=True, db_index=True)
+    # {"thumbnail": {"width": 150, "height": 250, "files": {"webp": "products/variants/...", ...}}, ...}
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
     length = models.CharField(max_length=50, null=True, blank=True)
     width = models.CharField(max_length=50, null=True, blank=True)
     size = models.CharField(max_length=50, null=True, blank=True)
+    length_cm = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, editable=False)
+    width_cm = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True, editable=False)
+    area_m2 = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False)
+    search_text = models.TextField(blank=True, default="", editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -67,12 +130,41 @@ class Product(models.Model):
             CheckConstraint(check=Q(sale_price__gte=0) | Q(sale_price__isnull=True), name="sale_price_non_negative"),
         ]
         ordering = ["-created_at"]
+        indexes = [
+            # size-range filtering on tableaus, with and without a branch
+            models.Index(fields=['type', 'length_cm', 'width_cm']),
+            models.Index(fields=['type', 'branch', 'length_cm', 'width_cm']),
+            # list ordering (newest / price), alone and after the type and branch filters;
+            # price ranges are served by the unit_price ones
+            models.Index(fields=['created_at']),
+            models.Index(fields=['unit_price']),
+            models.Index(fields=['type', 'created_at']),
+            models.Index(fields=['type', 'unit_price']),
+            models.Index(fields=['type', 'branch', 'created_at']),
+            models.Index(fields=['type', 'branch', 'unit_price']),
+        ]
+
+    SEARCH_FIELDS = ["name", "description", "serial_number", "branch", "type", "size", "length", "width"]
+    DIMENSION_FIELDS = ["length", "width", "size"]
+
+    objects = DerivedFieldsQuerySet.as_manager()
+
+    @classmethod
+    def derived_sources(cls):
+        sources = super().derived_sources()
+        for name in ("length_cm", "width_cm", "area_m2"):
+            sources[name] = cls.DIMENSION_FIELDS
+        return sources
+
+    def fill_derived_fields(self):
+        super().fill_derived_fields()
+        self.length_cm, self.width_cm, self.area_m2 = parse_dimensions(self.length, self.width, self.size)
 
     def __str__(self):
         return self.name + (f"({self.serial_number}) >>> ({self.length} x {self.width})" if self.serial_number else "")
 
 
-class Order(models.Model):
+class Order(DerivedFieldsMixin, models.Model):
     customer_name = models.CharField(max_length=255, default="مشتری ناشناخته")
     customer_phone = models.CharField(max_length=20, null=True, blank=True)
     customer_city = models.CharField(max_length=100, null=True, blank=True)
@@ -80,9 +172,12 @@ class Order(models.Model):
     customer_region = models.CharField(max_length=100, null=True, blank=True)
     customer_address = models.TextField(null=True, blank=True)
 
-    order_date = models.DateTimeField(auto_now_add=True)
+    # a default rather than auto_now_add so imported historical orders keep their date
+    order_date = models.DateTimeField(default=timezone.now)
     total_price = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
     total_profit = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    search_text = models.TextField(blank=True, default="", editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-order_date"]
@@ -90,8 +185,14 @@ class Order(models.Model):
             models.Index(fields=['customer_city']),
             models.Index(fields=['customer_state']),
             models.Index(fields=['customer_region']),
+            # date ranges and the list ordering; covering for the hourly sales series
+            models.Index(fields=['order_date', 'total_price', 'total_profit']),
         ]
 
+    SEARCH_FIELDS = ["customer_name", "customer_phone", "customer_address", "customer_city", "customer_region"]
+
+    objects = DerivedFieldsQuerySet.as_manager()
+
     def __str__(self):
         return f"Order #{self.id} - {self.customer_name}"
 
@@ -104,12 +205,17 @@ class OrderItem(models.Model):
     final_price = models.DecimalField(max_digits=12, decimal_places=2)
     profit = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
 
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            # covering index for per-product sales grouped by product
+            models.Index(fields=['product', 'final_price', 'profit']),
+        ]
 
-    def save(self, *args, **kwargs):
+    def calculate(self):
+        # also called directly by batched writes, which bypass save()
         if self.price is None:
             self.price = Decimal('0.00')
         if self.discount is None:
@@ -122,7 +228,70 @@ class OrderItem(models.Model):
         unit_price = self.product.unit_price or Decimal('0.00')
         self.profit = self.final_price - unit_price
 
+    def save(self, *args, **kwargs):
+        self.calculate()
         super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.product.name} in order {self.order_id}"
+
+
+class DateDimension(models.Model):
+    # gregorian -> jalali calendar attributes, filled by the build_date_dimension command
+    date = models.DateField(unique=True)
+    jalali_year = models.PositiveSmallIntegerField()
+    jalali_month = models.PositiveSmallIntegerField()
+    jalali_day = models.PositiveSmallIntegerField()
+    jalali_week = models.PositiveSmallIntegerField()
+    jalali_quarter = models.PositiveSmallIntegerField()
+
+    class Meta:
+        ordering = ["date"]
+        indexes = [
+            models.Index(fields=['jalali_year', 'jalali_month']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} = {self.jalali_year}/{self.jalali_month:02d}/{self.jalali_day:02d}"
+
+
+class DailySalesRollup(models.Model):
+    # one row per local (Asia/Tehran) day, kept in step with orders by main_app.rollups
+    date = models.DateField(unique=True)
+    sales = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    profit = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    order_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+
+    # join on date without a column of its own, used to bucket reports by jalali calendar
+    calendar = models.ForeignObject(
+        DateDimension, on_delete=models.DO_NOTHING, from_fields=["date"], to_fields=["date"],
+        related_name="rollups",
+    )
+
+    class Meta:
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.date}: {self.sales} ({self.order_count} orders)"
+
+
+class ProductSalesRollup(models.Model):
+    # running totals per product, kept in step with orders by main_app.rollups; a table of
+    # its own so saving a Product never writes back stale counters
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="sales")
+    sales_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    profit = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0.00'))
+    # not moved back when an order is deleted; the reconcile command recomputes it
+    last_sold = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # top-N by count or revenue reads the first N entries
+            models.Index(fields=['-sales_count']),
+            models.Index(fields=['-revenue']),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.sales_count} sold, {self.revenue}"
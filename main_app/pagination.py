@@ -0,0 +1,196 @@
+import base64
+import hashlib
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+APPROXIMATE_COUNT_TIMEOUT = 60
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over the queryset's own ordering plus ``id`` as tie-breaker.
+
+    Pages are fetched with a ``(a, b, id) > (x, y, z)`` style predicate instead of
+    OFFSET, and no COUNT is run unless ``with_total=1`` asks for an approximate one.
+    """
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    cursor_query_param = "cursor"
+    page_size_query_param = "page_size"
+    total_query_param = "with_total"
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering = self.get_ordering(queryset)
+        values, reverse = self.decode_cursor(request)
+
+        ordering = [(name, descending != reverse) for name, descending in self.ordering]
+        qs = queryset.order_by(*[self.order_expression(name, descending) for name, descending in ordering])
+        if values is not None:
+            qs = qs.filter(self.after(ordering, values))
+
+        rows = list(qs[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_previous = values is not None if not reverse else has_more
+        self.page = rows
+
+        self.approximate_count = None
+        if request.query_params.get(self.total_query_param) in ("1", "true"):
+            self.approximate_count = self.get_approximate_count(queryset)
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def get_ordering(self, queryset):
+        ordering = []
+        for item in queryset.query.order_by or queryset.model._meta.ordering:
+            if not isinstance(item, str):
+                continue
+            name = item.lstrip("-")
+            ordering.append(("id" if name == "pk" else name, item.startswith("-")))
+        if not any(name == "id" for name, _ in ordering):
+            ordering.append(("id", ordering[-1][1] if ordering else False))
+        return ordering
+
+    def nullable(self, name):
+        try:
+            return self.model._meta.get_field(name).null
+        except FieldDoesNotExist:
+            return False
+
+    def order_expression(self, name, descending):
+        if not self.nullable(name):
+            return ("-" if descending else "") + name
+        # NULL sorts above every value on every backend, so cursors can compare against it
+        return F(name).desc(nulls_first=True) if descending else F(name).asc(nulls_last=True)
+
+    def beyond(self, name, descending, value):
+        """Rows strictly past ``value`` in the column, NULL counting as the largest value."""
+        if value is None:
+            return Q(**{f"{name}__isnull": False}) if descending else Q(pk__in=[])
+        condition = Q(**{f"{name}__{'lt' if descending else 'gt'}": value})
+        if not descending and self.nullable(name):
+            condition |= Q(**{f"{name}__isnull": True})
+        return condition
+
+    def equal(self, name, value):
+        return Q(**{f"{name}__isnull": True}) if value is None else Q(**{name: value})
+
+    def after(self, ordering, values):
+        """Rows strictly after ``values`` in ``ordering``, expanded into ORs."""
+        q = Q()
+        for i, (name, desc) in enumerate(ordering):
+            condition = self.beyond(name, desc, values[i])
+            for j, (previous, _) in enumerate(ordering[:i]):
+                condition &= self.equal(previous, values[j])
+            q |= condition
+        first, descending = ordering[0]
+        if values[0] is None or self.nullable(first):
+            return q
+        # redundant bound on the leading column so the index can be range-scanned
+        return Q(**{f"{first}__{'lte' if descending else 'gte'}": values[0]}) & q
+
+    def position(self, obj):
+        # rows are model instances, or dicts in the views' fast list mode
+        if isinstance(obj, dict):
+            return [_encode_value(obj[name]) for name, _ in self.ordering]
+        return [_encode_value(getattr(obj, name)) for name, _ in self.ordering]
+
+    def encode_cursor(self, obj, reverse):
+        payload = json.dumps({"v": self.position(obj), "r": reverse}, separators=(",", ":"))
+        cursor = base64.urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()).decode())
+            raw = payload["v"]
+            if len(raw) != len(self.ordering):
+                raise ValueError
+            values = [self.to_python(name, value) for (name, _), value in zip(self.ordering, raw)]
+            return values, bool(payload.get("r"))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def to_python(self, name, value):
+        try:
+            field = self.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # annotations such as search_rank
+            return float(value)
+        return field.to_python(value)
+
+    def get_approximate_count(self, queryset):
+        # cached for a short while instead of counting on every page
+        sql, params = queryset.query.sql_with_params()
+        key = "count:" + hashlib.md5(f"{sql}{params!r}".encode()).hexdigest()
+        return cache.get_or_set(key, queryset.count, APPROXIMATE_COUNT_TIMEOUT)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        response = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+        if self.approximate_count is not None:
+            response["approximate_count"] = self.approximate_count
+        return Response(response)
+
+
+class SelectablePaginationMixin:
+    """Page-number pagination by default, keyset pagination with ``?pagination=cursor``."""
+    pagination_query_param = "pagination"
+
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator"):
+            params = self.request.query_params
+            if params.get(self.pagination_query_param) == "cursor" or "cursor" in params:
+                self._paginator = KeysetPagination()
+            else:
+                return super().paginator
+        return self._paginator
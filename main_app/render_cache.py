@@ -0,0 +1,123 @@
+import hashlib
+import os
+import tempfile
+import threading
+from django.conf import settings
+from .image_utils import render_size
+
+_locks = {}
+_locks_guard = threading.Lock()
+_written = 0
+
+
+def cache_dir():
+    return str(getattr(settings, "IMAGE_RENDER_CACHE_DIR", settings.BASE_DIR / "image_cache"))
+
+
+def render_key(source_name, width, height, fmt):
+    raw = f"{source_name}|{width}|{height}|{fmt}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def cache_path(key, fmt):
+    return os.path.join(cache_dir(), key[:2], f"{key}.{fmt}")
+
+
+def _key_lock(key):
+    with _locks_guard:
+        lock = _locks.get(key)
+        if lock is None:
+            lock = _locks[key] = [threading.Lock(), 0]
+        lock[1] += 1
+    return lock
+
+
+def _release_key_lock(key, lock):
+    with _locks_guard:
+        lock[1] -= 1
+        if not lock[1]:
+            del _locks[key]
+
+
+def get_rendered(field_file, width, height, fmt):
+    """Path of the cached render for this source and size, rendering it on a miss.
+
+    Concurrent misses for the same key in this process wait for a single render;
+    across processes the write is atomic, so at worst the work is repeated.
+    """
+    key = render_key(field_file.name, width, height, fmt)
+    path = cache_path(key, fmt)
+    if _touch(path):
+        return key, path
+
+    lock = _key_lock(key)
+    try:
+        with lock[0]:
+            if _touch(path):
+                return key, path
+            with field_file.open("rb") as raw:
+                data = render_size(raw, width, height, fmt)
+            _write(path, data)
+    finally:
+        _release_key_lock(key, lock)
+
+    _maybe_evict(len(data))
+    return key, path
+
+
+def _touch(path):
+    # the mtime doubles as the last-used time for LRU eviction
+    try:
+        os.utime(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def _write(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "wb") as out:
+        out.write(data)
+    os.replace(tmp, path)
+
+
+def _maybe_evict(size):
+    # walking the cache directory on every miss is wasteful; do it once a slice of the budget was written
+    global _written
+    _written += size
+    if _written >= settings.IMAGE_RENDER_CACHE_BYTES // 20:
+        _written = 0
+        evict()
+
+
+def evict(budget=None):
+    """Delete least recently used renders until the cache is within its byte budget."""
+    budget = budget if budget is not None else settings.IMAGE_RENDER_CACHE_BYTES
+    entries, total = [], 0
+    for root, _, files in os.walk(cache_dir()):
+        for name in files:
+            if name.endswith(".tmp"):
+                continue
+            path = os.path.join(root, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+    if total <= budget:
+        return 0
+
+    removed = 0
+    for _, size, path in sorted(entries):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+        # leave some headroom so the next few renders don't each trigger a scan-and-evict
+        if total <= budget * 0.9:
+            break
+    return removed
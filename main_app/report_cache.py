@@ -0,0 +1,88 @@
+import functools
+import hashlib
+import time
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag, urlencode
+from rest_framework.response import Response
+
+SALES_VERSION_KEY = "reports:sales_version"
+CATALOG_VERSION_KEY = "catalog:version"
+
+
+def _fresh_version():
+    # after an eviction the counter restarts from the clock, never from a value already used
+    return int(time.time() * 1000)
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def bump_version(key):
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _fresh_version()
+        cache.set(key, version, timeout=None)
+        return version
+
+
+def get_sales_version():
+    return get_version(SALES_VERSION_KEY)
+
+
+def bump_sales_version():
+    return bump_version(SALES_VERSION_KEY)
+
+
+def get_catalog_version():
+    return get_version(CATALOG_VERSION_KEY)
+
+
+def bump_catalog_version():
+    return bump_version(CATALOG_VERSION_KEY)
+
+
+def report_cache_key(action, query_params):
+    params = urlencode(sorted((key, sorted(query_params.getlist(key))) for key in query_params), doseq=True)
+    # reports are relative to "now" (today, last 24 hours), so the local hour is part of the key
+    hour = timezone.localtime().strftime("%Y%m%d%H")
+    digest = hashlib.md5(params.encode()).hexdigest()
+    # product rankings show Product.name, so a rename has to miss the cache as well
+    return f"reports:{get_sales_version()}:{get_catalog_version()}:{action}:{hour}:{digest}"
+
+
+def cache_report(view_func):
+    """Cache a ReportsViewSet action's data until the next order or product write."""
+    @functools.wraps(view_func)
+    def wrapper(self, request, *args, **kwargs):
+        key = report_cache_key(view_func.__name__, request.query_params)
+        # the key changes with every order or product write and every hour, so it validates the response too
+        etag = quote_etag(hashlib.md5(f"{key}|{request.accepted_media_type}".encode()).hexdigest())
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            response["ETag"] = etag
+            response["Cache-Control"] = "private, no-cache"
+            return response
+
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response["X-Cache"] = "HIT"
+        else:
+            response = view_func(self, request, *args, **kwargs)
+            if response.status_code == 200:
+                cache.set(key, response.data, settings.REPORTS_CACHE_TIMEOUT)
+            response["X-Cache"] = "MISS"
+        if response.status_code == 200:
+            response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+    return wrapper
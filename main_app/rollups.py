@@ -0,0 +1,227 @@
+from datetime import timedelta
+from decimal import Decimal
+from django.db import connections, transaction
+from django.db.models import Count, Sum, Max, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from .models import Order, OrderItem, DailySalesRollup, ProductSalesRollup
+
+
+def record_order(order, item_count, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) an order from its day's rollup row.
+
+    Must run inside the transaction that creates or deletes the order.
+    """
+    day = timezone.localdate(order.order_date)
+    DailySalesRollup.objects.get_or_create(date=day)
+    DailySalesRollup.objects.filter(date=day).update(
+        sales=F("sales") + sign * order.total_price,
+        profit=F("profit") + sign * order.total_profit,
+        order_count=F("order_count") + sign,
+        item_count=F("item_count") + sign * item_count,
+    )
+
+
+def add_to_rollups(deltas):
+    """Apply ``{date: {"sales", "profit", "order_count", "item_count"}}`` increments in bulk."""
+    fields = ["sales", "profit", "order_count", "item_count"]
+    with transaction.atomic():
+        existing = DailySalesRollup.objects.select_for_update().in_bulk(list(deltas), field_name="date")
+        created = []
+        for day, delta in deltas.items():
+            rollup = existing.get(day)
+            if rollup is None:
+                created.append(DailySalesRollup(date=day, **delta))
+                continue
+            for field in fields:
+                setattr(rollup, field, getattr(rollup, field) + delta[field])
+        DailySalesRollup.objects.bulk_update(existing.values(), fields, batch_size=500)
+        DailySalesRollup.objects.bulk_create(created, batch_size=500)
+
+
+def rollup_totals(**filters):
+    agg = DailySalesRollup.objects.filter(**filters).aggregate(
+        sales=Sum("sales"),
+        profit=Sum("profit"),
+        order_count=Sum("order_count"),
+        item_count=Sum("item_count"),
+    )
+    return {key: value or 0 for key, value in agg.items()}
+
+
+def dashboard_totals(today):
+    """Today, this month and each of the last 7 days in one conditional aggregate."""
+    month_start = today.replace(day=1)
+    days = [today - timedelta(days=i) for i in range(6, -1, -1)]
+
+    aggregates = {
+        "today_sales": Sum("sales", filter=Q(date=today)),
+        "today_profit": Sum("profit", filter=Q(date=today)),
+        "today_orders": Sum("order_count", filter=Q(date=today)),
+        "month_sales": Sum("sales", filter=Q(date__gte=month_start)),
+        "month_profit": Sum("profit", filter=Q(date__gte=month_start)),
+    }
+    for i, day in enumerate(days):
+        aggregates[f"sales_{i}"] = Sum("sales", filter=Q(date=day))
+        aggregates[f"profit_{i}"] = Sum("profit", filter=Q(date=day))
+
+    agg = DailySalesRollup.objects.filter(
+        date__gte=min(month_start, days[0]), date__lte=today
+    ).aggregate(**aggregates)
+    totals = {key: value or 0 for key, value in agg.items()}
+
+    totals["last_7_days"] = [
+        {"date": str(day), "sales": totals.pop(f"sales_{i}"), "profit": totals.pop(f"profit_{i}")}
+        for i, day in enumerate(days)
+    ]
+    return totals
+
+
+def item_deltas(items):
+    """``{product_id: {"sales_count", "revenue", "profit"}}`` for a set of order items."""
+    deltas = {}
+    for item in items:
+        delta = deltas.setdefault(item.product_id, {
+            "sales_count": 0, "revenue": Decimal("0.00"), "profit": Decimal("0.00"),
+        })
+        delta["sales_count"] += 1
+        delta["revenue"] += item.final_price
+        delta["profit"] += item.profit
+    return deltas
+
+
+def record_product_sales(deltas, sold_at=None, sign=1):
+    """Add (``sign=1``) or remove (``sign=-1``) ``item_deltas`` from the per-product totals.
+
+    One upsert for the whole order, whatever its number of products. Must run inside
+    the transaction that creates or deletes the order.
+    """
+    if not deltas:
+        return
+    connection = connections[ProductSalesRollup.objects.db]
+    table = connection.ops.quote_name(ProductSalesRollup._meta.db_table)
+    last_sold = connection.ops.adapt_datetimefield_value(sold_at if sign > 0 else None)
+    rows, params = [], []
+    # a fixed order, so concurrent orders lock shared rows the same way round
+    for pk, delta in sorted(deltas.items()):
+        rows.append("(%s, %s, %s, %s, %s)")
+        params += [pk, sign * delta["sales_count"], sign * delta["revenue"], sign * delta["profit"], last_sold]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (product_id, sales_count, revenue, profit, last_sold) "
+            f"VALUES {', '.join(rows)} ON CONFLICT (product_id) DO UPDATE SET "
+            f"sales_count = {table}.sales_count + excluded.sales_count, "
+            f"revenue = {table}.revenue + excluded.revenue, "
+            f"profit = {table}.profit + excluded.profit, "
+            f"last_sold = CASE WHEN {table}.last_sold IS NULL OR {table}.last_sold < excluded.last_sold "
+            f"THEN excluded.last_sold ELSE {table}.last_sold END",
+            params,
+        )
+
+
+def add_to_product_rollups(deltas):
+    """Apply ``{product_id: {"sales_count", "revenue", "profit", "last_sold"}}`` increments in bulk."""
+    fields = ["sales_count", "revenue", "profit"]
+    with transaction.atomic():
+        existing = ProductSalesRollup.objects.select_for_update().in_bulk(list(deltas))
+        created = []
+        for pk, delta in deltas.items():
+            rollup = existing.get(pk)
+            if rollup is None:
+                created.append(ProductSalesRollup(product_id=pk, **delta))
+                continue
+            for field in fields:
+                setattr(rollup, field, getattr(rollup, field) + delta[field])
+            if rollup.last_sold is None or delta["last_sold"] > rollup.last_sold:
+                rollup.last_sold = delta["last_sold"]
+        ProductSalesRollup.objects.bulk_update(existing.values(), fields + ["last_sold"], batch_size=500)
+        ProductSalesRollup.objects.bulk_create(created, batch_size=500)
+
+
+def product_sales():
+    """Items sold and revenue per product, busiest first: a scan of the sales_count index."""
+    return (
+        ProductSalesRollup.objects.filter(sales_count__gt=0)
+        .order_by("-sales_count")
+        .values("product", "sales_count", "revenue", name=F("product__name"))
+    )
+
+
+def compute_product_rollups():
+    """Aggregate the order items into ``{product_id: ProductSalesRollup}`` (unsaved)."""
+    rows = (
+        OrderItem.objects.order_by()
+        .values("product")
+        .annotate(sales_count=Count("id"), revenue=Sum("final_price"), profit=Sum("profit"),
+                  last_sold=Max("order__order_date"))
+    )
+    return {
+        row["product"]: ProductSalesRollup(
+            product_id=row["product"],
+            sales_count=row["sales_count"],
+            revenue=row["revenue"] or Decimal("0.00"),
+            profit=row["profit"] or Decimal("0.00"),
+            last_sold=row["last_sold"],
+        )
+        for row in rows
+    }
+
+
+def rebuild_product_rollups():
+    rollups = compute_product_rollups()
+    with transaction.atomic():
+        ProductSalesRollup.objects.all().delete()
+        ProductSalesRollup.objects.bulk_create(rollups.values(), batch_size=500)
+    return len(rollups)
+
+
+def compute_rollups(start=None, end=None):
+    """Aggregate the raw order tables into ``{date: DailySalesRollup}`` (unsaved)."""
+    orders = Order.objects.all()
+    items = OrderItem.objects.all()
+    if start:
+        orders = orders.filter(order_date__date__gte=start)
+        items = items.filter(order__order_date__date__gte=start)
+    if end:
+        orders = orders.filter(order_date__date__lte=end)
+        items = items.filter(order__order_date__date__lte=end)
+
+    rollups = {}
+    order_rows = (
+        orders.annotate(day=TruncDate("order_date"))
+        .order_by()
+        .values("day")
+        .annotate(sales=Sum("total_price"), profit=Sum("total_profit"), order_count=Count("id"))
+    )
+    for row in order_rows:
+        rollups[row["day"]] = DailySalesRollup(
+            date=row["day"],
+            sales=row["sales"] or Decimal("0.00"),
+            profit=row["profit"] or Decimal("0.00"),
+            order_count=row["order_count"],
+        )
+
+    item_rows = (
+        items.annotate(day=TruncDate("order__order_date"))
+        .order_by()
+        .values("day")
+        .annotate(item_count=Count("id"))
+    )
+    for row in item_rows:
+        rollups.setdefault(row["day"], DailySalesRollup(date=row["day"])).item_count = row["item_count"]
+
+    return rollups
+
+
+def rebuild_rollups(start=None, end=None):
+    rollups = compute_rollups(start, end)
+    existing = DailySalesRollup.objects.all()
+    if start:
+        existing = existing.filter(date__gte=start)
+    if end:
+        existing = existing.filter(date__lte=end)
+
+    with transaction.atomic():
+        existing.delete()
+        DailySalesRollup.objects.bulk_create(rollups.values(), batch_size=500)
+    return len(rollups)
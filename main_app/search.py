@@ -0,0 +1,193 @@
+import re
+
+from django.db import connections, DEFAULT_DB_ALIAS
+from django.db.models import BooleanField
+from django.db.models.expressions import RawSQL
+
+# tables whose search_text column is covered by a full-text index
+SEARCH_TABLES = ["main_app_product", "main_app_order"]
+
+_TRANSLATION = str.maketrans({
+    "ي": "ی",
+    "ى": "ی",
+    "ك": "ک",
+    "\u200c": " ",  # ZWNJ
+    **{chr(0x06F0 + i): str(i) for i in range(10)},  # Persian digits
+    **{chr(0x0660 + i): str(i) for i in range(10)},  # Arabic-Indic digits
+})
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text):
+    return _WHITESPACE.sub(" ", text.translate(_TRANSLATION)).strip().lower()
+
+
+def _fts_table(table):
+    return f"{table}_fts"
+
+
+# ---------------- SQLITE (FTS5) ----------------
+
+def _sqlite_triggers(table):
+    fts = _fts_table(table)
+    return {
+        f"{fts}_ai": (
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        ),
+        f"{fts}_au": (
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF search_text ON {table} BEGIN "
+            f"DELETE FROM {fts} WHERE rowid = old.id; "
+            f"INSERT INTO {fts}(rowid, search_text) VALUES (new.id, new.search_text); END"
+        ),
+        f"{fts}_ad": (
+            f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"DELETE FROM {fts} WHERE rowid = old.id; END"
+        ),
+    }
+
+
+def _sqlite_ensure(connection, table):
+    fts = _fts_table(table)
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT name FROM sqlite_master WHERE name = %s OR name LIKE %s", [fts, f"{fts}_a_"])
+        existing = {row[0] for row in cursor.fetchall()}
+        triggers = _sqlite_triggers(table)
+
+        if fts in existing:
+            cursor.execute(f"PRAGMA table_info({fts})")
+            columns = [row[1] for row in cursor.fetchall()]
+            if columns == ["search_text"] and set(triggers) <= existing:
+                return True
+            # stale layout or triggers dropped by a table remake, rebuild from scratch
+            for name in existing - {fts}:
+                cursor.execute(f"DROP TRIGGER IF EXISTS {name}")
+            cursor.execute(f"DROP TABLE {fts}")
+
+        try:
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE {fts} USING fts5(search_text, tokenize='unicode61 remove_diacritics 2')"
+            )
+        except Exception:
+            # sqlite compiled without FTS5, searches fall back to a LIKE per word
+            return False
+
+        for sql in triggers.values():
+            cursor.execute(sql)
+        cursor.execute(f"INSERT INTO {fts}(rowid, search_text) SELECT id, search_text FROM {table}")
+    return True
+
+
+def _fts_match_expression(words):
+    return " ".join('"' + w.replace('"', '""') + '"*' for w in words)
+
+
+def _sqlite_search(qs, words, ranked):
+    table = qs.model._meta.db_table
+    fts = _fts_table(table)
+    expression = _fts_match_expression(words)
+    qs = qs.filter(id__in=RawSQL(f"SELECT rowid FROM {fts} WHERE {fts} MATCH %s", (expression,)))
+    if ranked:
+        qs = qs.annotate(search_rank=RawSQL(
+            f'SELECT rank FROM {fts} WHERE {fts} MATCH %s AND rowid = "{table}"."id"', (expression,)
+        ))
+    return qs
+
+
+# ---------------- POSTGRESQL (tsvector + GIN) ----------------
+
+def _pg_vector_sql(table):
+    return f"""to_tsvector('simple'::regconfig, "{table}"."search_text")"""
+
+
+def _pg_ensure(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE INDEX IF NOT EXISTS {table}_search_text_gin ON {table} USING gin (({_pg_vector_sql(table)}))"
+        )
+    return True
+
+
+def _pg_search(qs, words, ranked):
+    table = qs.model._meta.db_table
+    query = " & ".join("'" + w.replace("'", "''") + "':*" for w in words)
+    vector = _pg_vector_sql(table)
+    qs = qs.filter(
+        RawSQL(f"{vector} @@ to_tsquery('simple'::regconfig, %s)", (query,), output_field=BooleanField())
+    )
+    if ranked:
+        qs = qs.annotate(
+            search_rank=RawSQL(f"-ts_rank({vector}, to_tsquery('simple'::regconfig, %s))", (query,))
+        )
+    return qs
+
+
+# ---------------- PUBLIC API ----------------
+
+def ensure_search_index(using=DEFAULT_DB_ALIAS, **kwargs):
+    connection = connections[using]
+    available = False
+    if connection.vendor in ("sqlite", "postgresql"):
+        ensure = _sqlite_ensure if connection.vendor == "sqlite" else _pg_ensure
+        available = all([ensure(connection, table) for table in SEARCH_TABLES])
+    connection._search_index = available
+    return available
+
+
+def _index_available(connection):
+    available = getattr(connection, "_search_index", None)
+    if available is None:
+        if connection.vendor == "sqlite":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT count(*) FROM sqlite_master WHERE name IN (%s)" % ", ".join(["%s"] * len(SEARCH_TABLES)),
+                    [_fts_table(t) for t in SEARCH_TABLES],
+                )
+                available = cursor.fetchone()[0] == len(SEARCH_TABLES)
+        else:
+            available = connection.vendor == "postgresql"
+        connection._search_index = available
+    return available
+
+
+def search_queryset(qs, search, ranked=False):
+    """Filter ``qs`` on its ``search_text`` column.
+
+    Terms with a digit (phones, serials) match anywhere in the text. When the full-text
+    index is available, other terms match the start of a word only: "تبر" finds "تبریز"
+    but "بریز" does not. With ``ranked`` the result is annotated with ``search_rank``
+    (lower is more relevant).
+    """
+    words = normalize_text(search).split()
+    if not words:
+        return qs
+
+    connection = connections[qs.db]
+    if _index_available(connection):
+        # the index only matches token prefixes; phone and serial fragments are searched
+        # anywhere in the text, as before the index
+        codes = [w for w in words if any(ch.isdigit() for ch in w)]
+        words = [w for w in words if w not in codes]
+        for w in codes:
+            qs = qs.filter(search_text__contains=w)
+        if not words:
+            return qs
+        if connection.vendor == "sqlite":
+            return _sqlite_search(qs, words, ranked)
+        if connection.vendor == "postgresql":
+            return _pg_search(qs, words, ranked)
+
+    for w in words:
+        qs = qs.filter(search_text__contains=w)
+    return qs
+
+
+def search_products(qs, search):
+    qs = search_queryset(qs, search, ranked=True)
+    if "search_rank" in qs.query.annotations:
+        qs = qs.order_by("search_rank", "-created_at")
+    return qs
+
+
+def search_orders(qs, search):
+    return search_queryset(qs, search)
@@ -1,20 +1,64 @@
 from rest_framework import serializers
 from persiantools.jdatetime import JalaliDateTime
 from django.db import transaction
-from django.shortcuts import get_object_or_404
 from decimal import Decimal
 from .models import CARPET_BRANCHES, TABLEAU_BRANCHES
 from .models import Product, Order, OrderItem
-from .image_utils import process_image
-from django.db.models import Sum
+from .image_queue import set_pending, enqueue_image
+from .rollups import record_order, record_product_sales, item_deltas
+from .fieldsets import SparseFieldsMixin
+from .jalali_utils import format_jalali_datetime
+
+
+CARPET_BRANCH_KEYS = frozenset(b[0] for b in CARPET_BRANCHES)
+TABLEAU_BRANCH_KEYS = frozenset(b[0] for b in TABLEAU_BRANCHES)
+
+
+def product_rule_error(product_type, branch, size, length, width):
+    """Branch and dimension rules per product type; returns the error message or None.
+
+    Shared by ProductSerializer and the catalog import, which checks whole batches.
+    """
+    if product_type == "carpet":
+        if branch not in CARPET_BRANCH_KEYS:
+            return "این شاخه متعلق به نوع 'فرش' نیست."
+
+    elif product_type == "tableau":
+        if branch not in TABLEAU_BRANCH_KEYS:
+            return "این شاخه متعلق به نوع 'تابلوفرش' نیست."
+
+    if product_type == "carpet":
+        if not size:
+            return "برای فرش وارد کردن size الزامی است."
+        if length or width:
+            return "برای فرش نباید length یا width وارد کنید."
+
+    elif product_type == "tableau":
+        if not length or not width:
+            return "برای تابلوفرش وارد کردن length و width الزامی است."
+        if size:
+            return "برای تابلوفرش نباید size وارد کنید."
+
+    return None
+
+
+def image_srcset(variants, storage, request=None):
+    """``{"webp": "<url> 150w, <url> 300w, ...", "jpeg": ...}`` for the processed variants."""
+    if not variants:
+        return None
+    srcset = {}
+    for variant in sorted(variants.values(), key=lambda v: v["width"]):
+        for ext, name in variant["files"].items():
+            url = storage.url(name)
+            if request is not None:
+                url = request.build_absolute_uri(url)
+            srcset.setdefault(ext, []).append(f"{url} {variant['width']}w")
+    return {ext: ", ".join(entries) for ext, entries in srcset.items()}
 
 
 class JalaliDateTimeField(serializers.Field):
     def to_representation(self, value):
-        if not value:
-            return None
-        j = JalaliDateTime.to_jalali(value)
-        return j.strftime("%Y/%m/%d - %H:%M")
+        return format_jalali_datetime(value)
 
     def to_internal_value(self, data):
         try:
@@ -23,10 +67,11 @@ class JalaliDateTimeField(serializers.Field):
             raise serializers.ValidationError("فرمت تاریخ شمسی معتبر نیست.")
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     created_at = JalaliDateTimeField(read_only=True)
     updated_at = JalaliDateTimeField(read_only=True)
     branch_display = serializers.SerializerMethodField(read_only=True)
+    image_srcset = serializers.SerializerMethodField(read_only=True)
 
     # Branch mappings
     CARPET_BRANCHES_DISPLAY = {
@@ -64,10 +109,13 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = [
             "id", "type", "branch", "branch_display", "serial_number", "name", "description",
-            "unit_price", "sale_price", "image", "length", "width", "size", "crop_sex",
+            "unit_price", "sale_price", "image", "image_srcset", "image_status", "length", "width", "size", "crop_sex",
             "created_at", "updated_at"
         ]
-        read_only_fields = ["id", "created_at", "updated_at", "branch_display"]
+        read_only_fields = ["id", "image_srcset", "image_status", "created_at", "updated_at", "branch_display"]
+
+    def get_image_srcset(self, obj):
+        return image_srcset(obj.image_variants, obj.image.storage, self.context.get("request"))
 
     def get_branch_display(self, obj):
         if obj.type == "carpet":
@@ -76,18 +124,27 @@ class ProductSerializer(serializers.ModelSerializer):
             return self.TABLEAU_BRANCHES_DISPLAY.get(obj.branch, obj.branch)
 
     def create(self, validated_data):
-        image = validated_data.get("image")
+        image = validated_data.pop("image", None)
+        product = Product(**validated_data)
         if image:
-            validated_data["image"] = process_image(image, size=(300, 500), target_kb=100)
+            set_pending(product, image)
+        product.save()
+        if product.image_status == "pending":
+            enqueue_image(product.pk)
+        return product
 
-        return super().create(validated_data)
-    
     def update(self, instance, validated_data):
-        image = validated_data.get("image")
+        clear_image = "image" in validated_data and not validated_data["image"]
+        image = validated_data.pop("image", None)
         if image:
-            validated_data["image"] = process_image(image, size=(300, 500), target_kb=100)
-
-        return super().update(instance, validated_data)
+            set_pending(instance, image)
+        elif clear_image:
+            instance.image = instance.image_source = instance.image_status = None
+            instance.image_variants = {}
+        instance = super().update(instance, validated_data)
+        if image and instance.image_status == "pending":
+            enqueue_image(instance.pk)
+        return instance
 
     def validate_unit_price(self, value):
         if value < 0:
@@ -100,36 +157,11 @@ class ProductSerializer(serializers.ModelSerializer):
         return value
 
     def validate(self, data):
-
-        product_type = data.get("type")
-        branch = data.get("branch")
-
-        size = data.get("size")
-        length = data.get("length")
-        width = data.get("width")
-
-        if product_type == "carpet":
-            valid = [b[0] for b in CARPET_BRANCHES]
-            if branch not in valid:
-                raise serializers.ValidationError("این شاخه متعلق به نوع 'فرش' نیست.")
-
-        elif product_type == "tableau":
-            valid = [b[0] for b in TABLEAU_BRANCHES]
-            if branch not in valid:
-                raise serializers.ValidationError("این شاخه متعلق به نوع 'تابلوفرش' نیست.")
-
-        if product_type == "carpet":
-            if not size:
-                raise serializers.ValidationError("برای فرش وارد کردن size الزامی است.")
-            if length or width:
-                raise serializers.ValidationError("برای فرش نباید length یا width وارد کنید.")
-
-        elif product_type == "tableau":
-            if not length or not width:
-                raise serializers.ValidationError("برای تابلوفرش وارد کردن length و width الزامی است.")
-            if size:
-                raise serializers.ValidationError("برای تابلوفرش نباید size وارد کنید.")
-
+        error = product_rule_error(
+            data.get("type"), data.get("branch"), data.get("size"), data.get("length"), data.get("width")
+        )
+        if error:
+            raise serializers.ValidationError(error)
         return data
 
 
@@ -158,7 +190,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
         read_only_fields = ["id", "product", "final_price", "profit", "created_at", "price"]
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     order_date = JalaliDateTimeField(read_only=True)
 
@@ -167,6 +199,24 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = ["id", "customer_name", "customer_phone", "customer_city", "customer_state", "customer_region", "customer_address", "total_price", "total_profit", "order_date", "items"]
         read_only_fields = ["id", "order_date", "total_price", "total_profit"]
 
+
+class OrderListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """Compact list row: the order header plus item count and product names instead of nested items."""
+    order_date = JalaliDateTimeField(read_only=True)
+    item_count = serializers.SerializerMethodField()
+    product_names = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Order
+        fields = ["id", "customer_name", "customer_phone", "customer_city", "customer_state", "customer_region", "customer_address", "total_price", "total_profit", "order_date", "item_count", "product_names"]
+        read_only_fields = fields
+
+    def get_item_count(self, obj):
+        return len(obj.items.all())
+
+    def get_product_names(self, obj):
+        return [item.product.name for item in obj.items.all()]
+
 class OrderCreateSerializer(serializers.ModelSerializer):
     items = serializers.ListField(child=serializers.DictField(), write_only=True)
 
@@ -188,32 +238,42 @@ class OrderCreateSerializer(serializers.ModelSerializer):
                 raise serializers.ValidationError("discount must be a number")
             if d < Decimal('0.00'):
                 raise serializers.ValidationError("discount cannot be negative")
-        return value
-
-    def create(self, validated_data):
-        items_data = validated_data.pop('items', [])
 
-        with transaction.atomic():
-            order = Order.objects.create(**validated_data)
+        try:
+            ids = {int(entry['product']) for entry in value}
+        except (TypeError, ValueError):
+            raise serializers.ValidationError("product must be an integer id")
+        products = Product.objects.in_bulk(ids)
+        missing = sorted(ids - products.keys())
+        if missing:
+            raise serializers.ValidationError(f"products not found: {missing}")
 
-            for item in items_data:
-                product = get_object_or_404(Product, pk=item['product'])
+        return [{**entry, 'product': products[int(entry['product'])]} for entry in value]
 
-                price = product.sale_price if product.sale_price is not None else product.unit_price
+    def create(self, validated_data):
+        items_data = validated_data.pop('items', [])
 
-                OrderItem.objects.create(
-                    order=order,
-                    product=product,
-                    price=price,
-                    discount=Decimal(str(item.get('discount', '0')))
-                )
-            totals = order.items.aggregate(
-                total_price=Sum('final_price'),
-                total_profit=Sum('profit')
+        items = []
+        for item in items_data:
+            product = item['product']
+            price = product.sale_price if product.sale_price is not None else product.unit_price
+            order_item = OrderItem(
+                product=product,
+                price=price,
+                discount=Decimal(str(item.get('discount', '0')))
             )
+            order_item.calculate()
+            items.append(order_item)
+
+        validated_data['total_price'] = sum((i.final_price for i in items), Decimal('0.00'))
+        validated_data['total_profit'] = sum((i.profit for i in items), Decimal('0.00'))
 
-            order.total_price = totals['total_price'] or Decimal('0.00')
-            order.total_profit = totals['total_profit'] or Decimal('0.00')
-            order.save(update_fields=['total_price', 'total_profit'])
+        with transaction.atomic():
+            order = Order.objects.create(**validated_data)
+            for order_item in items:
+                order_item.order = order
+            OrderItem.objects.bulk_create(items)
+            record_order(order, len(items))
+            record_product_sales(item_deltas(items), sold_at=order.order_date)
 
         return order
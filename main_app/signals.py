@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from .models import Product, Order, OrderItem
+from .report_cache import bump_sales_version, bump_catalog_version
+
+
+@receiver([post_save, post_delete], sender=Order)
+@receiver([post_save, post_delete], sender=OrderItem)
+def invalidate_reports(sender, **kwargs):
+    transaction.on_commit(bump_sales_version)
+
+
+@receiver([post_save, post_delete], sender=Product)
+def invalidate_catalog(sender, **kwargs):
+    transaction.on_commit(bump_catalog_version)
@@ -0,0 +1,551 @@
+import csv
+import re
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+from unittest import mock
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.db import connection, DatabaseError
+from django.db.models import F, Sum
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from openpyxl import load_workbook
+from PIL import Image
+from rest_framework.test import APIClient
+from .models import Product, Order, OrderItem, DailySalesRollup, DateDimension, ProductSalesRollup, CARPET_BRANCHES, TABLEAU_BRANCHES
+from . import image_utils
+from .instrumentation import fingerprint
+from .dimension_utils import parse_dimensions
+from .image_queue import process_product_image
+from .importers import import_orders
+from .rollups import compute_rollups, compute_product_rollups
+
+# one conditional aggregate over the rollup table + one for the top products
+DASHBOARD_MAX_QUERIES = 2
+
+TEST_CACHES = {"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}
+
+
+@override_settings(CACHES=TEST_CACHES)
+class APITestCase(TestCase):
+    """An empty in-memory cache for every test, so cached reports and version counters start clean."""
+    client_class = APIClient
+
+    def setUp(self):
+        cache.clear()
+
+    def create_carpet(self, **fields):
+        return Product.objects.create(**{
+            "type": "carpet", "branch": "qom", "name": "فرش قم", "size": "6", "unit_price": Decimal("100.00"), **fields,
+        })
+
+
+class DashboardTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_carpet(sale_price=Decimal("150.00"))
+
+    def create_order(self, discount=0):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/orders/",
+                {"customer_name": "مشتری", "items": [{"product": self.product.id, "discount": discount}]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 201)
+
+    def test_query_budget(self):
+        for discount in (0, 10, 20):
+            self.create_order(discount)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/reports/dashboard/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertLessEqual(len(ctx.captured_queries), DASHBOARD_MAX_QUERIES)
+
+        data = response.json()
+        self.assertEqual(Decimal(str(data["today_sales"])), Decimal("420.00"))
+        self.assertEqual(Decimal(str(data["today_profit"])), Decimal("120.00"))
+        self.assertEqual(data["today_orders"], 3)
+        self.assertEqual(Decimal(str(data["month_sales"])), Decimal("420.00"))
+        self.assertEqual(len(data["last_7_days"]), 7)
+        self.assertEqual(Decimal(str(data["last_7_days"][-1]["sales"])), Decimal("420.00"))
+        self.assertEqual(data["top_products"], [{"name": "فرش قم", "sales_count": 3}])
+
+    def test_cached_until_next_order(self):
+        self.create_order()
+
+        first = self.client.get("/api/reports/dashboard/")
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get("/api/reports/dashboard/")
+
+        self.assertEqual(first["X-Cache"], "MISS")
+        self.assertEqual(second["X-Cache"], "HIT")
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(second.json(), first.json())
+
+        self.create_order()
+        third = self.client.get("/api/reports/dashboard/")
+
+        self.assertEqual(third["X-Cache"], "MISS")
+        self.assertEqual(third.json()["today_orders"], 2)
+
+
+class ChartSalesTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        product = self.create_carpet()
+        self.client.post("/api/orders/", {"items": [{"product": product.id}]}, format="json")
+
+    def test_all_periods_one_query_each(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/reports/chart_sales/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 4)
+        data = response.json()
+        self.assertEqual([len(data[p]["data"]) for p in ("today", "week", "month", "year")], [24, 7, 30, 12])
+        self.assertEqual(Decimal(str(data["today"]["data"][-1]["sales"])), Decimal("100.00"))
+        self.assertEqual(Decimal(str(data["year"]["data"][-1]["sales"])), Decimal("100.00"))
+
+    def test_monthly_sales(self):
+        response = self.client.get("/api/reports/monthly_sales/")
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data["data"]), 12)
+        self.assertEqual(data["total_count"], 1)
+
+    def test_jalali_report_does_not_fill_dimension(self):
+        today = timezone.localdate()
+        call_command("build_date_dimension", start=today - timedelta(days=9), end=today, stdout=StringIO())
+
+        with self.assertLogs("main_app.timeseries", "WARNING"):
+            response = self.client.get(
+                "/api/reports/daily_sales/", {"calendar": "jalali", "start_date": "1990-01-01", "end_date": str(today)},
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(DateDimension.objects.count(), 10)
+        data = response.json()
+        self.assertEqual(len(data["data"]), 10)
+        self.assertEqual(data["total_count"], 1)
+
+
+class FastListTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        # orjson leaves U+2028 raw; the fast path has to escape it like the JSON renderer
+        carpet = self.create_carpet(name="فرش\u2028قم", serial_number="۱۲۳", sale_price=Decimal("150.00"))
+        Product.objects.create(
+            type="tableau", branch="gol", name="تابلو \"گل\"", length="120", width="80",
+            unit_price=Decimal("1234567.50"), image="products/variants/ab/card.webp", image_status="ready",
+            image_variants={"card": {"width": 300, "height": 500, "files": {"webp": "products/variants/ab/card.webp"}}},
+        )
+        self.client.post(
+            "/api/orders/", {"customer_name": "مشتری", "items": [{"product": carpet.id}, {"product": carpet.id}]},
+            format="json",
+        )
+
+    def assertSameAsSerializer(self, url):
+        slow = self.client.get(url)
+        fast = self.client.get(url + ("&" if "?" in url else "?") + "fast=1")
+        self.assertEqual(slow.status_code, 200)
+        self.assertEqual(slow.content, fast.content.replace(b"&fast=1", b"").replace(b"?fast=1", b""))
+
+    def test_products_match_serializer(self):
+        self.assertSameAsSerializer("/api/products/")
+        self.assertSameAsSerializer("/api/products/?fields=id,branch_display,created_at")
+        self.assertSameAsSerializer("/api/products/?pagination=cursor&page_size=1")
+
+    def test_orders_match_serializer(self):
+        self.assertSameAsSerializer("/api/orders/")
+        self.assertSameAsSerializer("/api/orders/?pagination=cursor")
+
+    def test_sparse_fields_and_expand(self):
+        products = self.client.get("/api/products/?fields=id,name").json()["results"]
+        self.assertEqual([set(row) for row in products], [{"id", "name"}] * 2)
+
+        compact = self.client.get("/api/orders/").json()["results"][0]
+        self.assertNotIn("items", compact)
+        name = Product.objects.get(type="carpet").name
+        self.assertEqual((compact["item_count"], compact["product_names"]), (2, [name, name]))
+        expanded = self.client.get("/api/orders/?expand=items").json()["results"][0]
+        self.assertEqual(len(expanded["items"]), 2)
+
+
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_carpet()
+
+    def test_product_list_not_modified_until_write(self):
+        first = self.client.get("/api/products/")
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        self.product.name = "فرش تبریز"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        third = self.client.get("/api/products/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(third.status_code, 200)
+
+    def test_order_list_follows_orders_and_product_names(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/orders/", {"items": [{"product": self.product.id}]}, format="json")
+        first = self.client.get("/api/orders/?pagination=cursor")
+        with CaptureQueriesContext(connection) as ctx:
+            second = self.client.get("/api/orders/?pagination=cursor", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        # product_names are embedded in the compact rows
+        self.product.name = "فرش تبریز"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.save()
+        third = self.client.get("/api/orders/?pagination=cursor", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(third.json()["results"][0]["product_names"], ["فرش تبریز"])
+
+    def test_report_not_modified_until_order(self):
+        first = self.client.get("/api/reports/dashboard/")
+        self.assertEqual(self.client.get("/api/reports/dashboard/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/orders/", {"items": [{"product": self.product.id}]}, format="json")
+        self.assertEqual(self.client.get("/api/reports/dashboard/", HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 200)
+
+
+class InstrumentationTests(APITestCase):
+    def test_query_headers(self):
+        self.create_carpet()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get("/api/products/")
+        self.assertEqual(response["X-DB-Queries"], str(len(ctx.captured_queries)))
+        self.assertRegex(response["Server-Timing"], r'^db;dur=[\d.]+;desc="\d+ queries", ')
+
+    def test_fingerprint(self):
+        sql = "SELECT * FROM t WHERE id IN (%s, %s) AND name = 'a''b' LIMIT 30"
+        self.assertEqual(fingerprint(sql), "SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?")
+
+    def test_metrics_admin_only(self):
+        self.assertEqual(self.client.get("/api/_metrics/").status_code, 403)
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        self.client.get("/api/products/")
+        endpoints = self.client.get("/api/_metrics/").json()["endpoints"]
+        self.assertGreaterEqual(endpoints["GET /api/products/"]["count"], 1)
+
+
+class SeedBenchTests(APITestCase):
+    def test_seed_covers_branches_and_rollup(self):
+        call_command("seed_bench", products=40, orders=60, years=2, stdout=StringIO())
+        self.assertEqual(
+            set(Product.objects.values_list("type", "branch")),
+            {("carpet", b) for b, _ in CARPET_BRANCHES} | {("tableau", b) for b, _ in TABLEAU_BRANCHES},
+        )
+        self.assertEqual(Order.objects.count(), 60)
+        self.assertEqual(
+            DailySalesRollup.objects.aggregate(s=Sum("sales"))["s"],
+            Order.objects.aggregate(s=Sum("total_price"))["s"],
+        )
+
+    def test_flush_needs_confirmation(self):
+        self.create_carpet()
+        with mock.patch("builtins.input", return_value="no"), self.assertRaises(CommandError):
+            call_command("seed_bench", products=1, orders=0, flush=True, stdout=StringIO())
+        self.assertTrue(Product.objects.filter(name="فرش قم").exists())
+
+        call_command("seed_bench", products=1, orders=0, flush=True, interactive=False, stdout=StringIO())
+        self.assertFalse(Product.objects.filter(name="فرش قم").exists())
+
+
+class ProductSalesTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.qom = self.create_carpet()
+        self.tabriz = self.create_carpet(branch="tabriz", name="فرش تبریز", unit_price=Decimal("50.00"))
+
+    def create_order(self, *products):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post("/api/orders/", {"items": [{"product": p.id} for p in products]}, format="json")
+        return response.json()["id"]
+
+    def test_order_queries_independent_of_products(self):
+        products = [self.qom, self.tabriz] + [
+            self.create_carpet(name=f"فرش {i}", unit_price=Decimal("10.00"))
+            for i in range(18)
+        ]
+        # the first order of the day also creates its rollup row
+        self.create_order(self.tabriz)
+        with CaptureQueriesContext(connection) as one:
+            self.create_order(self.qom)
+        with CaptureQueriesContext(connection) as twenty:
+            self.create_order(*products)
+        self.assertEqual(len(twenty.captured_queries), len(one.captured_queries))
+        self.assertEqual(ProductSalesRollup.objects.get(pk=self.qom.pk).sales_count, 2)
+        self.assertEqual(ProductSalesRollup.objects.get(pk=self.tabriz.pk).sales_count, 2)
+        self.assertEqual(ProductSalesRollup.objects.filter(sales_count=1).count(), 18)
+
+    def test_counters_follow_orders(self):
+        self.create_order(self.qom, self.tabriz)
+        self.create_order(self.tabriz)
+        last = self.create_order(self.tabriz, self.tabriz)
+
+        data = self.client.get("/api/reports/top_products/").json()
+        self.assertEqual([(r["name"], r["sales_count"]) for r in data], [("فرش تبریز", 4), ("فرش قم", 1)])
+        self.assertEqual(Decimal(str(data[0]["revenue"])), Decimal("200.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/orders/{last}/")
+        stored = {r.pk: r for r in ProductSalesRollup.objects.all()}
+        for pk, expected in compute_product_rollups().items():
+            self.assertEqual(stored[pk].sales_count, expected.sales_count)
+            self.assertEqual(stored[pk].revenue, expected.revenue)
+            self.assertEqual(stored[pk].profit, expected.profit)
+
+    def test_rename_reaches_cached_report(self):
+        self.create_order(self.qom)
+        first = self.client.get("/api/reports/top_products/")
+        self.assertEqual(first.json()[0]["name"], "فرش قم")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(f"/api/products/{self.qom.id}/", {"name": "فرش قم اعلا"}, format="json")
+        response = self.client.get("/api/reports/top_products/", HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.json()[0]["name"], "فرش قم اعلا")
+
+
+class ImagePipelineTests(APITestCase):
+    def test_upload_is_processed_off_the_request(self):
+        upload = BytesIO()
+        Image.new("RGB", (900, 1200), (120, 60, 30)).save(upload, "JPEG")
+        file = SimpleUploadedFile("carpet.jpg", upload.getvalue(), content_type="image/jpeg")
+        data = {"type": "carpet", "branch": "qom", "name": "فرش قم", "size": "6", "unit_price": "100.00", "image": file}
+
+        with tempfile.TemporaryDirectory() as media, override_settings(MEDIA_ROOT=media, IMAGE_WORKERS=0):
+            with mock.patch("main_app.image_queue.process_variants") as encode_in_request:
+                with self.captureOnCommitCallbacks(execute=True):
+                    created = self.client.post("/api/products/", data, format="multipart").json()
+            encode_in_request.assert_not_called()
+            self.assertEqual(created["image_status"], "pending")
+
+            self.assertEqual(process_product_image(created["id"]), "ready")
+            product = self.client.get(f"/api/products/{created['id']}/").json()
+        self.assertEqual(product["image_status"], "ready")
+        self.assertTrue(product["image"].endswith(".webp"))
+        self.assertTrue(product["image_srcset"])
+
+    def test_encode_stops_at_max_quality_when_it_fits(self):
+        flat = Image.new("RGB", (300, 500), (180, 40, 40))
+        with mock.patch("main_app.image_utils._save", wraps=image_utils._save) as save:
+            out = image_utils.encode(flat, "WEBP", 100)
+        self.assertEqual(save.call_count, 1)
+        self.assertLessEqual(len(out.getvalue()), 100 * 1024)
+
+    def test_render_falls_back_to_webp_without_avif(self):
+        source = BytesIO()
+        Image.new("RGB", (400, 300), (20, 90, 160)).save(source, "JPEG")
+        source.seek(0)
+        with mock.patch("main_app.image_utils.features.check", return_value=False):
+            data = image_utils.render_size(source, 200, None, "avif")
+        self.assertEqual(data[8:12], b"WEBP")
+
+    def test_encode_bisects_within_budget(self):
+        noise = Image.effect_noise((600, 1000), 100).convert("RGB")
+        with mock.patch("main_app.image_utils._save", wraps=image_utils._save) as save:
+            out = image_utils.encode(noise, "JPEG", 250)
+        self.assertLessEqual(save.call_count, 2 + image_utils.QUALITY_SEARCH_STEPS)
+        self.assertLessEqual(len(out.getvalue()), 250 * 1024)
+
+
+class ImportTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.product = self.create_carpet()
+
+    def order_lines(self, count):
+        lines = ["order_ref,order_date,customer_name,product_id,price"]
+        lines += [f"r{i},2024-03-0{i + 1} 10:00,مشتری,{self.product.id},150" for i in range(count)]
+        return lines
+
+    def test_product_csv_round_trip_and_xlsx_export(self):
+        self.product.serial_number = "S-1"
+        self.product.save()
+        exported = b"".join(self.client.get("/api/products/export/", {"file_format": "csv"}).streaming_content).decode("utf-8-sig")
+        rows = list(csv.DictReader(StringIO(exported)))
+        self.assertEqual([(r["serial_number"], r["name"]) for r in rows], [("S-1", "فرش قم")])
+
+        rows[0]["name"] = "فرش قم اعلا"
+        rows.append(dict(rows[0], id="", serial_number="S-2", name="فرش نو"))
+        rows.append(dict(rows[0], id="", serial_number="S-3", type="rug"))
+        upload = StringIO()
+        writer = csv.DictWriter(upload, fieldnames=list(rows[0]))
+        writer.writeheader()
+        writer.writerows(rows)
+        self.client.force_authenticate(User.objects.create(username="admin", is_staff=True))
+        file = SimpleUploadedFile("products.csv", upload.getvalue().encode("utf-8"), content_type="text/csv")
+        stats = self.client.post("/api/products/import/", {"file": file}, format="multipart").json()
+        self.assertEqual((stats["created"], stats["updated"], stats["rejected"]), (1, 1, 1))
+        self.assertEqual(Product.objects.get(serial_number="S-1").name, "فرش قم اعلا")
+
+        response = self.client.get("/api/products/export/", {"file_format": "xlsx"})
+        sheet = load_workbook(BytesIO(b"".join(response.streaming_content))).active
+        self.assertEqual(sorted(row[1] for row in sheet.iter_rows(min_row=2, values_only=True)), ["S-1", "S-2"])
+
+    def test_failed_chunk_leaves_rollups_consistent(self):
+        real_bulk_create = OrderItem.objects.bulk_create
+        calls = []
+
+        def fail_second_chunk(objs, *args, **kwargs):
+            calls.append(1)
+            if len(calls) == 2:
+                raise DatabaseError("disk full")
+            return real_bulk_create(objs, *args, **kwargs)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with mock.patch.object(OrderItem.objects, "bulk_create", side_effect=fail_second_chunk):
+                with self.assertRaises(DatabaseError):
+                    import_orders(self.order_lines(3), "csv", chunk_size=1)
+
+        self.assertEqual(Order.objects.count(), 1)
+        expected = {day: (r.sales, r.order_count, r.item_count) for day, r in compute_rollups().items()}
+        stored = {r.date: (r.sales, r.order_count, r.item_count) for r in DailySalesRollup.objects.all()}
+        self.assertEqual(stored, expected)
+        self.assertEqual(ProductSalesRollup.objects.get(pk=self.product.pk).sales_count, 1)
+
+
+class KeysetPaginationTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(7):
+            self.create_carpet(name=f"فرش {i}", sale_price=None if i % 3 == 0 else Decimal(100 + i % 2))
+
+    def walk(self, url):
+        """Ids over all ``next`` links, then over all ``previous`` links back from the last page."""
+        forward, last = [], None
+        while url:
+            last = self.client.get(url).json()
+            forward += [row["id"] for row in last["results"]]
+            url = last["next"]
+        backward = [row["id"] for row in last["results"]]
+        url = last["previous"]
+        while url:
+            data = self.client.get(url).json()
+            backward = [row["id"] for row in data["results"]] + backward
+            url = data["previous"]
+        return forward, backward
+
+    def test_walks_nullable_ordering_both_ways(self):
+        orderings = {
+            "sale_price": [F("sale_price").asc(nulls_last=True), "id"],
+            "-sale_price": [F("sale_price").desc(nulls_first=True), "-id"],
+        }
+        for param, order_by in orderings.items():
+            forward, backward = self.walk(f"/api/products/?pagination=cursor&page_size=2&ordering={param}")
+            expected = list(Product.objects.order_by(*order_by).values_list("id", flat=True))
+            self.assertEqual(forward, expected)
+            self.assertEqual(backward, expected)
+
+
+class SearchTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.order = Order.objects.create(customer_name="علی محمدی", customer_phone="09121234567")
+        Order.objects.create(customer_name="مریم رضایی", customer_phone="09350000000")
+
+    def search(self, path, term):
+        return [row["id"] for row in self.client.get(path, {"search": term}).json()["results"]]
+
+    def test_product_index_follows_writes(self):
+        product = self.create_carpet(branch="kashan", name="فرش کاشان")
+        self.assertEqual(self.search("/api/products/", "کاش"), [product.id])
+
+        product.name = "فرش تبریز"
+        product.save()
+        self.assertEqual(self.search("/api/products/", "کاشان"), [])
+        self.assertEqual(self.search("/api/products/", "تبریز"), [product.id])
+
+        product.delete()
+        self.assertEqual(self.search("/api/products/", "تبریز"), [])
+
+    def test_phone_suffix_matches_order(self):
+        self.assertEqual(self.search("/api/orders/", "1234567"), [self.order.id])
+        self.assertEqual(self.search("/api/orders/", "محمد 4567"), [self.order.id])
+
+    def test_codes_match_anywhere_words_by_prefix(self):
+        product = self.create_carpet(branch="kashan", name="فرش تبریز", serial_number="AB1234")
+        self.assertEqual(self.search("/api/products/", "b123"), [product.id])
+        self.assertEqual(self.search("/api/products/", "تبر"), [product.id])
+        # letter-only fragments from inside a word are not found through the index
+        self.assertEqual(self.search("/api/products/", "بریز"), [])
+
+
+class DimensionTests(APITestCase):
+    def test_parse_dimensions(self):
+        self.assertEqual(parse_dimensions("120/80", None, None), (Decimal("120"), Decimal("80"), Decimal("0.96")))
+        self.assertEqual(parse_dimensions(None, None, "۱۵۰ در ۱۰۰"), (Decimal("150"), Decimal("100"), Decimal("1.50")))
+        self.assertEqual(parse_dimensions(None, None, "۲٫۵ متری"), (None, None, Decimal("2.5")))
+
+    def test_tableau_size_range_filter(self):
+        small = Product.objects.create(type="tableau", branch="gol", name="تابلو کوچک", length="40", width="30", unit_price=Decimal("10.00"))
+        Product.objects.create(type="tableau", branch="gol", name="تابلو بزرگ", length="120/80", unit_price=Decimal("10.00"))
+        response = self.client.get("/api/products/", {"type": "tableau", "max_length": "۵۰", "max_width": "50"})
+        self.assertEqual([row["id"] for row in response.json()["results"]], [small.id])
+
+
+# hot endpoints and the temp b-tree uses each one is allowed
+HOT_ENDPOINTS = [
+    ("/api/products/", ()),
+    ("/api/products/?type=carpet&branch=qom", ()),
+    ("/api/products/?type=carpet&branch=qom&min_price=10&max_price=500&sort=price_low", ()),
+    ("/api/products/?sort=price_high", ()),
+    ("/api/products/?type=tableau&sort=oldest&pagination=cursor", ()),
+    ("/api/orders/", ()),
+    # hourly buckets are computed from order_date; the grouped rows are one day's index range
+    ("/api/reports/chart_sales/?period=today", ("GROUP BY",)),
+    ("/api/reports/daily_sales/", ()),
+    ("/api/reports/top_products/", ()),
+    ("/api/reports/sales_by_product/", ()),
+    ("/api/reports/dashboard/", ()),
+]
+# prefetch lookups by a page's worth of keys; their sort is bounded by the page size
+PREFETCH_SQL = re.compile(r'"\w+_id" IN \(')
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+
+class QueryPlanTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        carpet = self.create_carpet(name="فرش")
+        Product.objects.create(type="tableau", branch="gol", name="تابلو", length="120", width="80", unit_price=Decimal("50.00"))
+        self.client.post("/api/orders/", {"items": [{"product": carpet.id}]}, format="json")
+
+    def plan(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def test_hot_queries_use_indexes(self):
+        if connection.vendor != "sqlite":
+            self.skipTest("plans are checked on SQLite")
+        for url, allowed in HOT_ENDPOINTS:
+            cache.clear()
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.client.get(url).status_code, 200, url)
+            for query in ctx.captured_queries:
+                sql = query["sql"]
+                if not sql.startswith("SELECT") or PREFETCH_SQL.search(sql):
+                    continue
+                for step in self.plan(sql, ()):
+                    with self.subTest(url=url, step=step):
+                        self.assertIsNone(FULL_SCAN.match(step), sql)
+                        if step.startswith("USE TEMP B-TREE FOR "):
+                            self.assertIn(step.removeprefix("USE TEMP B-TREE FOR "), allowed, sql)
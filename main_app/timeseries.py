@@ -0,0 +1,173 @@
+import logging
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from django.db.models import Count, Sum, Min, F
+from django.db.models.functions import TruncHour, TruncDay, TruncWeek, TruncMonth, TruncYear
+from django.utils import timezone
+from persiantools.jdatetime import JalaliDate
+from .models import Order, DailySalesRollup, DateDimension
+from .jalali_utils import to_jalali_date
+
+logger = logging.getLogger(__name__)
+
+TRUNC_FUNCTIONS = {
+    "hour": TruncHour,
+    "day": TruncDay,
+    "week": TruncWeek,
+    "month": TruncMonth,
+    "year": TruncYear,
+}
+GRANULARITIES = list(TRUNC_FUNCTIONS)
+CALENDARS = ["gregorian", "jalali"]
+
+# DateDimension columns each jalali bucket is grouped on
+JALALI_GROUPS = {
+    "day": ["date"],
+    "week": ["jalali_year", "jalali_week"],
+    "month": ["jalali_year", "jalali_month"],
+    "year": ["jalali_year"],
+}
+
+
+def truncate(value, granularity, tzinfo):
+    """Python side of the SQL Trunc* functions, used to build the gap-filled bucket list."""
+    if granularity == "hour":
+        if not isinstance(value, datetime):
+            value = datetime.combine(value, datetime.min.time())
+        if timezone.is_naive(value):
+            value = timezone.make_aware(value, tzinfo)
+        return value.astimezone(tzinfo).replace(minute=0, second=0, microsecond=0)
+
+    if isinstance(value, datetime):
+        value = timezone.localtime(value, tzinfo).date() if timezone.is_aware(value) else value.date()
+    if granularity == "day":
+        return value
+    if granularity == "week":
+        return value - timedelta(days=value.weekday())
+    if granularity == "month":
+        return value.replace(day=1)
+    return value.replace(month=1, day=1)
+
+
+def next_bucket(bucket, granularity, tzinfo):
+    if granularity == "hour":
+        # step in UTC so DST changes neither skip nor repeat an hour
+        return (bucket.astimezone(dt_timezone.utc) + timedelta(hours=1)).astimezone(tzinfo)
+    if granularity == "day":
+        return bucket + timedelta(days=1)
+    if granularity == "week":
+        return bucket + timedelta(weeks=1)
+    if granularity == "month":
+        return date(bucket.year + bucket.month // 12, bucket.month % 12 + 1, 1)
+    return date(bucket.year + 1, 1, 1)
+
+
+def months_ago(day, months):
+    """First day of the month ``months`` calendar months before ``day``."""
+    index = day.year * 12 + day.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def bucket_range(start, end, granularity, tzinfo):
+    buckets = []
+    current = truncate(start, granularity, tzinfo)
+    last = truncate(end, granularity, tzinfo)
+    while current <= last:
+        buckets.append(current)
+        current = next_bucket(current, granularity, tzinfo)
+    return buckets
+
+
+def _jalali_bucket(row, granularity):
+    if granularity == "month":
+        return JalaliDate(row["jalali_year"], row["jalali_month"], 1)
+    if granularity == "year":
+        return JalaliDate(row["jalali_year"], 1, 1)
+    return to_jalali_date(row["first_day"])
+
+
+def jalali_sales_series(start, end, granularity):
+    """Daily rollup joined to DateDimension and grouped by jalali day/week/month/year.
+
+    The dimension is the outer side of the join, so empty buckets come back from
+    the same query. The range is limited to the days ``build_date_dimension`` has
+    filled; a report read never writes dimension rows.
+    """
+    if granularity not in JALALI_GROUPS:
+        raise ValueError(f"granularity {granularity!r} is not supported for the jalali calendar")
+    group = JALALI_GROUPS[granularity]
+    rows = list(
+        DateDimension.objects
+        .filter(date__range=(start, end))
+        .values(*group)
+        .annotate(
+            first_day=Min("date"),
+            days=Count("id"),
+            sales=Sum("rollups__sales"),
+            profit=Sum("rollups__profit"),
+            count=Sum("rollups__order_count"),
+        )
+        .order_by(*group)
+    )
+    if sum(row["days"] for row in rows) != (end - start).days + 1:
+        logger.warning("date dimension does not cover %s .. %s; run manage.py build_date_dimension", start, end)
+
+    return [
+        {
+            "bucket": _jalali_bucket(row, granularity),
+            "sales": row["sales"] or 0,
+            "profit": row["profit"] or 0,
+            "count": row["count"] or 0,
+        }
+        for row in rows
+    ]
+
+
+def sales_series(start, end, granularity, tzinfo=None, calendar="gregorian"):
+    """Sales, profit and order count per bucket between ``start`` and ``end`` (inclusive).
+
+    Runs one grouped query and fills empty buckets with zeros. Hourly series are
+    read from orders; coarser ones from the daily rollup, whose dates are
+    already local to TIME_ZONE. With ``calendar="jalali"`` buckets are jalali
+    days/weeks/months/years and ``bucket`` is a ``JalaliDate``.
+    """
+    if granularity not in TRUNC_FUNCTIONS:
+        raise ValueError(f"unknown granularity {granularity!r}")
+    tzinfo = tzinfo or timezone.get_current_timezone()
+    if calendar == "jalali" and granularity != "hour":
+        return jalali_sales_series(truncate(start, "day", tzinfo), truncate(end, "day", tzinfo), granularity)
+    buckets = bucket_range(start, end, granularity, tzinfo)
+    if not buckets:
+        return []
+
+    trunc = TRUNC_FUNCTIONS[granularity]
+    if granularity == "hour":
+        rows = (
+            Order.objects
+            .filter(order_date__gte=buckets[0], order_date__lt=next_bucket(buckets[-1], granularity, tzinfo))
+            .annotate(bucket=trunc("order_date", tzinfo=tzinfo))
+            .values("bucket")
+            .annotate(sales=Sum("total_price"), profit=Sum("total_profit"), count=Count("id"))
+            .order_by("bucket")
+        )
+    else:
+        rows = (
+            DailySalesRollup.objects
+            .filter(date__gte=truncate(start, "day", tzinfo), date__lte=truncate(end, "day", tzinfo))
+            # rollup rows already are days; grouping on the column itself walks the date index
+            .annotate(bucket=F("date") if granularity == "day" else trunc("date"))
+            .values("bucket")
+            .annotate(sales=Sum("sales"), profit=Sum("profit"), count=Sum("order_count"))
+            .order_by("bucket")
+        )
+
+    rows_map = {row["bucket"]: row for row in rows}
+    data = []
+    for bucket in buckets:
+        row = rows_map.get(bucket)
+        data.append({
+            "bucket": bucket,
+            "sales": row["sales"] if row else 0,
+            "profit": row["profit"] if row else 0,
+            "count": row["count"] if row else 0,
+        })
+    return data
@@ -1,6 +1,6 @@
 from rest_framework import routers
 from django.urls import path, include
-from .views import ProductViewSet, OrderViewSet, ReportsViewSet
+from .views import ProductViewSet, OrderViewSet, ReportsViewSet, metrics
 from .vies_docs import api_docs
 
 router = routers.DefaultRouter()
@@ -22,4 +22,5 @@ urlpatterns = [
     path('reports/chart-sales/', ReportsViewSet.as_view({'get': 'chart_sales'})),
     path('reports/chart_sales/', ReportsViewSet.as_view({'get': 'chart_sales'})),
     path('docs/', api_docs, name='api_docs'),
+    path('_metrics/', metrics, name='metrics'),
 ]
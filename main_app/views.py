@@ -1,42 +1,52 @@
 from rest_framework import viewsets, status, filters
 from rest_framework.response import Response
-from rest_framework.decorators import action
+from rest_framework.decorators import action, api_view, permission_classes
+from rest_framework.parsers import MultiPartParser
+from rest_framework.permissions import IsAdminUser
 from django.db import transaction
-from django.db.models import Count, Sum, F, Q, IntegerField
+from django.db.models import Count, Sum, F, Q, IntegerField, Prefetch
+from django.conf import settings
+from django.http import FileResponse, HttpResponseNotModified
 from django.utils import timezone
 from .models import Product, Order, OrderItem, CARPET_BRANCHES, TABLEAU_BRANCHES
-from .serializers import ProductSerializer, OrderSerializer, OrderCreateSerializer
-from datetime import datetime, timedelta
-from django.db.models.functions import TruncDate, Cast
-
-
-class ProductViewSet(viewsets.ModelViewSet):
+from .serializers import ProductSerializer, OrderSerializer, OrderListSerializer, OrderCreateSerializer
+from .search import search_products, search_orders
+from .dimension_utils import parse_number
+from .rollups import record_order, record_product_sales, item_deltas, rollup_totals, dashboard_totals, product_sales
+from .timeseries import sales_series, months_ago, CALENDARS
+from .jalali_utils import jalali_months_ago, jalali_years_ago
+from .report_cache import cache_report, get_catalog_version, CATALOG_VERSION_KEY, SALES_VERSION_KEY
+from .pagination import SelectablePaginationMixin
+from .fieldsets import SparseFieldsetViewMixin
+from .conditional import ConditionalGetMixin
+from .fast_lists import FastListMixin, PRODUCT_VALUES, ORDER_VALUES, product_rows, order_rows
+from .importers import import_orders, import_products
+from .exporters import stream_catalog_csv, stream_catalog_xlsx
+from .image_utils import RENDER_FORMATS, MAX_RENDER_SIDE, render_format
+from .render_cache import get_rendered, render_key
+from .instrumentation import endpoint_stats
+from datetime import date, datetime, timedelta
+import codecs
+from django.db.models.functions import Cast
+
+
+class ProductViewSet(ConditionalGetMixin, FastListMixin, SparseFieldsetViewMixin, SelectablePaginationMixin, viewsets.ModelViewSet):
     queryset = Product.objects.all().order_by("-created_at")
     serializer_class = ProductSerializer
+    fast_values = PRODUCT_VALUES
+    fast_rows = staticmethod(product_rows)
+    fast_fields = ProductSerializer.Meta.fields
 
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
-    search_fields = ['name', 'serial_number', 'description']
+    filter_backends = [filters.OrderingFilter]
     ordering_fields = ['unit_price', 'sale_price', 'created_at']
+    version_key = CATALOG_VERSION_KEY
 
     def get_queryset(self):
         qs = super().get_queryset()
         params = self.request.query_params
         search = params.get("search")
         if search:
-            normalized = search.replace("ي", "ی").replace("ك", "ک").strip()
-            words = normalized.split()
-
-            for w in words:
-                qs = qs.filter(
-                    Q(name__icontains=w) |
-                    Q(description__icontains=w) |
-                    Q(serial_number__icontains=w) |
-                    Q(branch__icontains=w) |
-                    Q(type__icontains=w) |
-                    Q(size__icontains=w) |
-                    Q(length__icontains=w) |
-                    Q(width__icontains=w)
-                )
+            qs = search_products(qs, search)
 
         min_price = params.get("min_price")
         max_price = params.get("max_price")
@@ -64,14 +74,18 @@ class ProductViewSet(viewsets.ModelViewSet):
         max_width = params.get("max_width")
 
         if type_filter == "tableau":
-            if min_length:
-                qs = qs.filter(length__gte=min_length)
-            if max_length:
-                qs = qs.filter(length__lte=max_length)
-            if min_width:
-                qs = qs.filter(width__gte=min_width)
-            if max_width:
-                qs = qs.filter(width__lte=max_width)
+            min_length = parse_number(min_length)
+            max_length = parse_number(max_length)
+            min_width = parse_number(min_width)
+            max_width = parse_number(max_width)
+            if min_length is not None:
+                qs = qs.filter(length_cm__gte=min_length)
+            if max_length is not None:
+                qs = qs.filter(length_cm__lte=max_length)
+            if min_width is not None:
+                qs = qs.filter(width_cm__gte=min_width)
+            if max_width is not None:
+                qs = qs.filter(width_cm__lte=max_width)
 
         sort = params.get("sort")
         if sort == "newest":
@@ -98,293 +112,248 @@ class ProductViewSet(viewsets.ModelViewSet):
             return Response(TABLEAU_BRANCHES)
 
         return Response({"error": "type لازم است"}, status=400)
+
+    @action(detail=True, methods=['get'], url_path='image')
+    def resized_image(self, request, pk=None):
+        params = request.query_params
+        try:
+            width = int(params["w"]) if params.get("w") else None
+            height = int(params["h"]) if params.get("h") else None
+        except ValueError:
+            return Response({"error": "w و h باید عدد صحیح باشند"}, status=400)
+        if not width and not height:
+            return Response({"error": "w یا h لازم است"}, status=400)
+        if any(v is not None and not 0 < v <= MAX_RENDER_SIDE for v in (width, height)):
+            return Response({"error": f"w و h باید بین 1 و {MAX_RENDER_SIDE} باشند"}, status=400)
+        fmt = params.get("fmt", "webp").lower()
+        if fmt not in RENDER_FORMATS:
+            return Response({"error": f"fmt باید یکی از {', '.join(RENDER_FORMATS)} باشد"}, status=400)
+        fmt = render_format(fmt)
+
+        product = self.get_object()
+        # prefer the original upload over the already downscaled card image
+        source = product.image_source if product.image_source else product.image
+        if not source:
+            return Response({"error": "این محصول تصویر ندارد"}, status=404)
+
+        # the key covers the source file name and the size, so it is a strong validator on its own
+        etag = f'"{render_key(source.name, width, height, fmt)}"'
+        if etag in [t.strip() for t in request.headers.get("If-None-Match", "").split(",")]:
+            response = HttpResponseNotModified()
+        else:
+            _, path = get_rendered(source, width, height, fmt)
+            response = FileResponse(open(path, "rb"), content_type=f"image/{fmt}")
+        response["ETag"] = etag
+        response["Cache-Control"] = f"public, max-age={settings.IMAGE_RENDER_MAX_AGE}"
+        return response
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        qs = self.filter_queryset(self.get_queryset())
+        # "format" is taken by DRF's renderer override
+        fmt = request.query_params.get("file_format", "csv")
+        if fmt == "csv":
+            return stream_catalog_csv(qs)
+        if fmt == "xlsx":
+            return stream_catalog_xlsx(qs)
+        return Response({"error": "file_format باید csv یا xlsx باشد"}, status=400)
+
+    @action(detail=False, methods=['post'], url_path='import',
+            permission_classes=[IsAdminUser], parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "file لازم است"}, status=400)
+        fmt = request.data.get("format") or upload.name.lower().rsplit(".", 1)[-1]
+        if fmt not in ("csv", "xlsx"):
+            return Response({"error": "format باید csv یا xlsx باشد"}, status=400)
+
+        stats = import_products(upload, fmt)
+        changed = stats["created"] or stats["updated"]
+        return Response(stats, status=status.HTTP_201_CREATED if changed else status.HTTP_200_OK)
         
 
 
-class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.all().order_by("-order_date").prefetch_related('items__product')
+class OrderViewSet(ConditionalGetMixin, FastListMixin, SparseFieldsetViewMixin, SelectablePaginationMixin, viewsets.ModelViewSet):
+    queryset = Order.objects.all().order_by("-order_date")
     serializer_class = OrderSerializer
-    search_fields = ['customer_name', 'customer_phone', 'customer_address', 'customer_city', 'customer_region']
-    filter_backends = [filters.SearchFilter, filters.OrderingFilter]
+    fast_values = ORDER_VALUES
+    fast_rows = staticmethod(order_rows)
+    fast_fields = OrderListSerializer.Meta.fields
+    filter_backends = [filters.OrderingFilter]
+    version_key = SALES_VERSION_KEY
 
     def get_queryset(self):
         qs = super().get_queryset()
         params = self.request.query_params
         search = params.get("search")
         if search:
-            normalized = search.replace("ي", "ی").replace("ك", "ک").strip()
-            words = normalized.split()
-
-            for w in words:
-                qs = qs.filter(
-                    Q(customer_name__icontains=w) |
-                    Q(customer_phone__icontains=w) |
-                    Q(customer_address__icontains=w) |
-                    Q(customer_city__icontains=w) |
-                    Q(customer_region__icontains=w)
-                )
-            
+            qs = search_orders(qs, search)
+
+        if self.compact_list:
+            if self.wants_field("item_count") or self.wants_field("product_names"):
+                # only what the compact row shows, not every product column
+                items = OrderItem.objects.select_related("product").only("order", "product__name")
+                qs = qs.prefetch_related(Prefetch("items", queryset=items))
+        elif self.wants_field("items"):
+            qs = qs.prefetch_related('items__product')
         return qs
 
+    def use_fast_list(self, request):
+        return self.compact_list and super().use_fast_list(request)
+
+    def embedded_versions(self):
+        if self.compact_list and not self.wants_field("product_names"):
+            return ()
+        return (get_catalog_version(),)
+
+    @property
+    def compact_list(self):
+        """List responses use the compact row unless ``?expand=items`` asks for the nested lines."""
+        return self.action == "list" and "items" not in self.requested_expand
 
     def get_serializer_class(self):
         if self.action == "create":
             return OrderCreateSerializer
+        if self.compact_list:
+            return OrderListSerializer
         return OrderSerializer
 
+    @action(detail=False, methods=['post'], url_path='import',
+            permission_classes=[IsAdminUser], parser_classes=[MultiPartParser])
+    def bulk_import(self, request):
+        upload = request.FILES.get("file")
+        if upload is None:
+            return Response({"error": "file لازم است"}, status=400)
+        fmt = request.data.get("format") or ("csv" if upload.name.lower().endswith(".csv") else "jsonl")
+        if fmt not in ("csv", "jsonl"):
+            return Response({"error": "format باید csv یا jsonl باشد"}, status=400)
+
+        stats = import_orders(codecs.iterdecode(upload, "utf-8-sig"), fmt)
+        return Response(stats, status=status.HTTP_201_CREATED if stats["orders"] else status.HTTP_200_OK)
+
     def destroy(self, request, *args, **kwargs):
         order = self.get_object()
-        order.delete()
+        with transaction.atomic():
+            items = list(order.items.all())
+            order.delete()
+            record_order(order, len(items), sign=-1)
+            record_product_sales(item_deltas(items), sign=-1)
         return Response({"message": "Order deleted"}, status=status.HTTP_200_OK)
 
 
 class ReportsViewSet(viewsets.ViewSet):
     @action(detail=False, methods=['get'])
+    @cache_report
     def sales_by_product(self, request):
-        qs = OrderItem.objects.values('product', 'product__name').annotate(
-            sales_count=Count('id'),
-            revenue=Sum('final_price')
-        ).order_by('-sales_count')
-        return Response(list(qs))
+        return Response([
+            {"product": r["product"], "product__name": r["name"], "sales_count": r["sales_count"], "revenue": r["revenue"]}
+            for r in product_sales()
+        ])
 
     @action(detail=False, methods=['get'])
+    @cache_report
     def total_revenue(self, request):
-        total = OrderItem.objects.aggregate(total_revenue=Sum('final_price')) or {'total_revenue': 0}
-        return Response(total)
+        return Response({'total_revenue': rollup_totals()['sales']})
 
     @action(detail=False, methods=['get'])
+    @cache_report
     def total_profit(self, request):
         total = Order.objects.aggregate(total_profit=Sum(F('total_profit'))) or {'total_profit': 0}
         return Response(total)
 
     @action(detail=False, methods=['get'])
+    @cache_report
     def top_products(self, request):
-        items = (
-            OrderItem.objects.values(name=F("product__name"))
-            .annotate(sales_count=Count('id'), revenue=Sum('final_price'))
-            .order_by("-sales_count")[:10]
-        )
-        return Response(list(items))
+        items = product_sales()[:10]
+        return Response([
+            {"name": r["name"], "sales_count": r["sales_count"], "revenue": r["revenue"]} for r in items
+        ])
 
     @action(detail=False, methods=['get'])
+    @cache_report
     def sales_range(self, request):
         start = request.query_params.get("start")
         end = request.query_params.get("end")
         if not start or not end:
             return Response({"error": "start & end required"}, status=400)
-        total = Order.objects.filter(order_date__date__range=[start, end]).aggregate(total=Sum("total_price"))
-        total_sales = total.get("total") or 0
-        total_profit_agg = Order.objects.filter(order_date__date__range=[start, end]).aggregate(total_profit=Sum("total_profit"))
-        total_profit = total_profit_agg.get("total_profit") or 0
+        totals = rollup_totals(date__range=[start, end])
+        total_sales = totals["sales"]
+        total_profit = totals["profit"]
         return Response({"start": start, "end": end, "total_sales": total_sales, "total_profit": total_profit})
 
     @action(detail=False, methods=['get'])
+    @cache_report
     def dashboard(self, request):
-        today = timezone.localdate()
-        year, month = today.year, today.month
-        today_sales = Order.objects.filter(order_date__date=today).aggregate(total=Sum("total_price"))
-        today_sales = today_sales.get("total") or 0
-        today_profit_agg = Order.objects.filter(order_date__date=today).aggregate(total_profit=Sum("total_profit"))
-        today_profit = today_profit_agg.get("total_profit") or 0
-        today_orders = Order.objects.filter(order_date__date=today).count()
-        month_sales = Order.objects.filter(order_date__year=year, order_date__month=month).aggregate(total=Sum("total_price"))
-        month_sales = month_sales.get("total") or 0
-        month_profit_agg = Order.objects.filter(order_date__year=year, order_date__month=month).aggregate(total_profit=Sum("total_profit"))
-        month_profit = month_profit_agg.get("total_profit") or 0
-
-        top = (
-            OrderItem.objects.values(name=F("product__name"))
-            .annotate(sales_count=Count('id'))
-            .order_by("-sales_count")[:5]
-        )
+        totals = dashboard_totals(timezone.localdate())
 
-        last_7 = []
-        for i in range(7):
-            day = today - timezone.timedelta(days=i)
-            total = Order.objects.filter(order_date__date=day).aggregate(total=Sum("total_price"))
-            total = total.get("total") or 0
-            profit_agg = Order.objects.filter(order_date__date=day).aggregate(total_profit=Sum("total_profit"))
-            profit = profit_agg.get("total_profit") or 0
-            last_7.append({"date": str(day), "sales": total, "profit": profit})
-        last_7.reverse()
+        top = [{"name": r["name"], "sales_count": r["sales_count"]} for r in product_sales()[:5]]
 
         inventory_value = None
 
         return Response({
-            "today_sales": today_sales,
-            "today_profit": today_profit,
-            "today_orders": today_orders,
-            "month_sales": month_sales,
-            "month_profit": month_profit,
-            "top_products": list(top),
-            "last_7_days": last_7,
+            "today_sales": totals["today_sales"],
+            "today_profit": totals["today_profit"],
+            "today_orders": totals["today_orders"],
+            "month_sales": totals["month_sales"],
+            "month_profit": totals["month_profit"],
+            "top_products": top,
+            "last_7_days": totals["last_7_days"],
             "inventory_value": inventory_value
         })
     
 
     @action(detail=False, methods=['get'])
+    @cache_report
     def chart_sales(self, request):
         period = request.query_params.get('period')
         start_date = request.query_params.get('start_date')
         end_date = request.query_params.get('end_date')
-        now = timezone.now()
-        today = timezone.localdate()
-    
+        calendar = request.query_params.get('calendar', 'gregorian')
+        if calendar not in CALENDARS:
+            return Response({"error": "calendar باید gregorian یا jalali باشد"}, status=400)
+        now = timezone.localtime()
+        today = now.date()
+
+        def points(series, label_format):
+            return [
+                {"label": p["bucket"].strftime(label_format), "sales": p["sales"], "profit": p["profit"]}
+                for p in series
+            ]
+
         # ---------------- TODAY (hourly) ----------------
         def get_today_data():
-            data = []
-            for i in range(23, -1, -1):
-                hour_start = now - timedelta(hours=i)
-                hour_end = hour_start - timedelta(hours=1)
-    
-                agg = Order.objects.filter(
-                    order_date__gte=hour_end,
-                    order_date__lt=hour_start
-                ).aggregate(
-                    sales=Sum("total_price"),
-                    profit=Sum("total_profit")
-                )
-    
-                data.append({
-                    "label": hour_end.strftime("%H:%M"),
-                    "sales": agg["sales"] or 0,
-                    "profit": agg["profit"] or 0,
-                })
-            return data
-    
+            return points(sales_series(now - timedelta(hours=23), now, "hour"), "%H:%M")
+
         # ---------------- WEEK (daily) ----------------
         def get_week_data():
-            data = []
-            qs = (
-                Order.objects
-                .filter(order_date__date__gte=today - timedelta(days=6))
-                .annotate(day=TruncDate("order_date"))
-                .values("day")
-                .annotate(
-                    sales=Sum("total_price"),
-                    profit=Sum("total_profit")
-                )
-            )
-    
-            qs_map = {item["day"]: item for item in qs}
-    
-            for i in range(6, -1, -1):
-                day = today - timedelta(days=i)
-                item = qs_map.get(day)
-                data.append({
-                    "label": str(day),
-                    "sales": item["sales"] if item else 0,
-                    "profit": item["profit"] if item else 0,
-                })
-            return data
-    
+            return points(sales_series(today - timedelta(days=6), today, "day", calendar=calendar), "%Y-%m-%d")
+
         # ---------------- MONTH (daily) ----------------
         def get_month_data():
-            data = []
-            start = today - timedelta(days=29)
-    
-            qs = (
-                Order.objects
-                .filter(order_date__date__range=(start, today))
-                .annotate(day=TruncDate("order_date"))
-                .values("day")
-                .annotate(
-                    sales=Sum("total_price"),
-                    profit=Sum("total_profit")
-                )
-            )
-    
-            qs_map = {item["day"]: item for item in qs}
-    
-            current = start
-            while current <= today:
-                item = qs_map.get(current)
-                data.append({
-                    "label": str(current),
-                    "sales": item["sales"] if item else 0,
-                    "profit": item["profit"] if item else 0,
-                })
-                current += timedelta(days=1)
-    
-            return data
-    
+            return points(sales_series(today - timedelta(days=29), today, "day", calendar=calendar), "%Y-%m-%d")
+
         # ---------------- YEAR (monthly) ----------------
         def get_year_data():
-            data = []
-    
-            for i in range(11, -1, -1):
-                month_date = today - timedelta(days=i * 30)
-                year = month_date.year
-                month = month_date.month
-    
-                agg = Order.objects.filter(
-                    order_date__year=year,
-                    order_date__month=month
-                ).aggregate(
-                    sales=Sum("total_price"),
-                    profit=Sum("total_profit")
-                )
-    
-                data.append({
-                    "label": f"{year}-{month:02d}",
-                    "sales": agg["sales"] or 0,
-                    "profit": agg["profit"] or 0,
-                })
-    
-            return data
-    
+            start = jalali_months_ago(today, 11) if calendar == "jalali" else months_ago(today, 11)
+            return points(sales_series(start, today, "month", calendar=calendar), "%Y-%m")
+
         # ---------------- CUSTOM RANGE ----------------
         def get_custom_range_data(start_date, end_date):
-            data = []
-    
             start = datetime.strptime(start_date, "%Y-%m-%d").date()
             end = datetime.strptime(end_date, "%Y-%m-%d").date()
-    
-            qs = (
-                Order.objects
-                .filter(order_date__date__range=(start, end))
-                .annotate(day=TruncDate("order_date"))
-                .values("day")
-                .annotate(
-                    sales=Sum("total_price"),
-                    profit=Sum("total_profit"),
-                    count = Count("id"),
-                )
-                .order_by("day")
-            )            
-
-            qs_map = {item["day"]: item for item in qs}
-
-            total_sales = 0
-            total_profit = 0
-            total_count = 0
-            
-            current = start
-            while current <= end:
-                item = qs_map.get(current)
-                sales = item["sales"] if item else 0
-                profit = item["profit"] if item else 0
-                count = item["count"] if item else 0
-
-                total_sales += sales
-                total_profit += profit
-                total_count += count
-
-                data.append({
-                    "label": str(current),
-                    "sales": item["sales"] if item else 0,
-                    "profit": item["profit"] if item else 0,
-                    "count": item["count"] if item else 0,
-                })
-                current += timedelta(days=1)
-    
+
+            data = [
+                {"label": str(p["bucket"]), "sales": p["sales"], "profit": p["profit"], "count": p["count"]}
+                for p in sales_series(start, end, "day", calendar=calendar)
+            ]
             return {
                 "period": "custom",
                 "start_date": start_date,
                 "end_date": end_date,
-                "total_sales": total_sales,
-                "total_profit": total_profit,
-                "total_count": total_count,
+                "total_sales": sum(p["sales"] for p in data),
+                "total_profit": sum(p["profit"] for p in data),
+                "total_count": sum(p["count"] for p in data),
                 "data": data
             }
     
@@ -424,7 +393,61 @@ class ReportsViewSet(viewsets.ViewSet):
             status=400
         )
 
+    def _series_report(self, request, period, granularity, label_format):
+        today = timezone.localdate()
+        calendar = request.query_params.get("calendar", "gregorian")
+        if calendar not in CALENDARS:
+            return Response({"error": "calendar باید gregorian یا jalali باشد"}, status=400)
+
+        if granularity == "day":
+            default_start = today - timedelta(days=29)
+        elif granularity == "month":
+            default_start = jalali_months_ago(today, 11) if calendar == "jalali" else months_ago(today, 11)
+        else:
+            default_start = jalali_years_ago(today, 4) if calendar == "jalali" else date(today.year - 4, 1, 1)
+
+        try:
+            start = datetime.strptime(request.query_params["start_date"], "%Y-%m-%d").date() \
+                if request.query_params.get("start_date") else default_start
+            end = datetime.strptime(request.query_params["end_date"], "%Y-%m-%d").date() \
+                if request.query_params.get("end_date") else today
+        except ValueError:
+            return Response({"error": "start_date و end_date باید به فرمت YYYY-MM-DD باشند"}, status=400)
+        if start > end:
+            return Response({"error": "start_date نباید بعد از end_date باشد"}, status=400)
+
+        data = [
+            {"label": p["bucket"].strftime(label_format), "sales": p["sales"], "profit": p["profit"], "count": p["count"]}
+            for p in sales_series(start, end, granularity, calendar=calendar)
+        ]
+        return Response({
+            "period": period,
+            "calendar": calendar,
+            "start_date": str(start),
+            "end_date": str(end),
+            "total_sales": sum(p["sales"] for p in data),
+            "total_profit": sum(p["profit"] for p in data),
+            "total_count": sum(p["count"] for p in data),
+            "data": data,
+        })
+
+    @action(detail=False, methods=['get'])
+    @cache_report
+    def daily_sales(self, request):
+        return self._series_report(request, "daily", "day", "%Y-%m-%d")
+
     @action(detail=False, methods=['get'])
+    @cache_report
+    def monthly_sales(self, request):
+        return self._series_report(request, "monthly", "month", "%Y-%m")
+
+    @action(detail=False, methods=['get'])
+    @cache_report
+    def yearly_sales(self, request):
+        return self._series_report(request, "yearly", "year", "%Y")
+
+    @action(detail=False, methods=['get'])
+    @cache_report
     def customers_by_region(self, request):
         regions = (
             Order.objects
@@ -458,3 +481,9 @@ class ReportsViewSet(viewsets.ViewSet):
             'total_orders': sum(r['order_count'] for r in regions_list),
             'regions': regions_list
         })
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def metrics(request):
+    return Response(endpoint_stats.snapshot())